@@ -1,27 +1,399 @@
 import streamlit as st
 import os
+import io
+import queue
+import mimetypes
+import zipfile
+import hashlib
 import dotenv
 import tempfile
 import json
 import time
-from flow import create_tutorial_flow
-from utils.markdown_converter import markdown_to_html, markdown_to_pdf, create_combined_markdown, get_file_contents
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from utils.output_dirs import find_project_dir
+from utils.markdown_converter import markdown_to_html, markdown_to_pdf, html_to_pdf, create_combined_markdown, get_file_contents
 
 # Load environment variables
 dotenv.load_dotenv()
 
 # Default file patterns
-DEFAULT_INCLUDE_PATTERNS = {
+DEFAULT_INCLUDE_PATTERNS = frozenset({
     "*.py", "*.js", "*.ts", "*.go", "*.java", "*.pyi", "*.pyx", 
     "*.c", "*.cc", "*.cpp", "*.h", "*.md", "*.rst", "Dockerfile", 
     "Makefile", "*.yaml", "*.yml"
-}
+})
 
-DEFAULT_EXCLUDE_PATTERNS = {
+DEFAULT_EXCLUDE_PATTERNS = frozenset({
     "*test*", "tests/*", "docs/*", "examples/*", "v1/*", 
     "dist/*", "build/*", "experimental/*", "deprecated/*", 
     "legacy/*", ".git/*", ".github/*"
-}
+})
+
+# Size limits for st.markdown: above the soft limit the rest goes behind an expander,
+# above the hard limit the content is shown as plain text
+MD_SOFT_LIMIT = 256 * 1024
+MD_HARD_LIMIT = 2 * 1024 * 1024
+
+# Tutorial runs that may execute at once across all sessions; later ones wait their turn
+MAX_CONCURRENT_RUNS = int(os.getenv("MAX_CONCURRENT_RUNS", "4"))
+
+# Make sure chapters are served as markdown even where the system MIME table lacks .md
+mimetypes.add_type("text/markdown", ".md")
+
+# Text area defaults, joined once in a stable order so reruns see identical values
+_INCLUDE_DEFAULT_STR = "\n".join(sorted(DEFAULT_INCLUDE_PATTERNS))
+_EXCLUDE_DEFAULT_STR = "\n".join(sorted(DEFAULT_EXCLUDE_PATTERNS))
+
+@st.cache_resource
+def _get_flow():
+    """Build the tutorial flow once per process and reuse it across reruns."""
+    # Imported lazily: flow pulls in the LLM/crawler stack, which the landing page doesn't need
+    from flow import create_tutorial_flow
+    return create_tutorial_flow()
+
+@st.cache_resource
+def _get_executor():
+    """Shared worker pool that runs tutorial flows off the script thread."""
+    return ThreadPoolExecutor(max_workers=MAX_CONCURRENT_RUNS)
+
+@st.cache_resource
+def _get_pdf_executor():
+    """Separate pool for PDF builds, so they never queue behind multi-minute flow runs."""
+    return ThreadPoolExecutor(max_workers=2)
+
+class _EmptyCrawl(Exception):
+    """Raised inside _cached_crawl so empty/failed crawls are not cached."""
+    def __init__(self, result):
+        super().__init__("crawl returned no files")
+        self.result = result
+
+@st.cache_data(ttl=600, show_spinner=False)
+def _cached_crawl(repo_url, token, include_key, exclude_key, max_file_size, use_relative_paths, _kwargs):
+    """Crawl once per repo/token/filter combination; underscore args are left out of the cache key."""
+    # Imported lazily, like the flow: the crawler loads requests and GitPython
+    from utils.crawl_github_files import crawl_github_files
+    result = crawl_github_files(
+        repo_url=repo_url,
+        token=token,
+        max_file_size=max_file_size,
+        use_relative_paths=use_relative_paths,
+        **_kwargs
+    )
+    if not result.get("files"):
+        raise _EmptyCrawl(result)
+    return result
+
+def _crawl_repo_cached(repo_url, token=None, max_file_size=1 * 1024 * 1024, use_relative_paths=False,
+                       include_patterns=None, exclude_patterns=None, **kwargs):
+    """Drop-in for crawl_github_files whose results are reused for 10 minutes on identical re-submits."""
+    try:
+        return _cached_crawl(
+            repo_url,
+            token,
+            tuple(sorted(include_patterns or ())),
+            tuple(sorted(exclude_patterns or ())),
+            max_file_size,
+            use_relative_paths,
+            dict(include_patterns=include_patterns, exclude_patterns=exclude_patterns, **kwargs)
+        )
+    except _EmptyCrawl as e:
+        return e.result
+
+@st.cache_resource(hash_funcs={frozenset: hash})
+def _make_matcher(patterns: frozenset):
+    """Match predicate for a set of globs, compiled once per distinct pattern set."""
+    from utils.crawl_github_files import compile_patterns
+    return compile_patterns(patterns)
+
+def _parse_patterns(text, default_text, default_patterns):
+    """Pattern set from a one-per-line text area; the untouched default maps straight to its frozenset."""
+    if text.strip() == default_text:
+        return default_patterns
+    return frozenset(filter(None, (line.strip() for line in text.split("\n"))))
+
+def _output_stamp(entries):
+    """(name, mtime, size) of each scandir entry: the cache key for _zip_output, with no extra directory walk."""
+    return tuple(sorted((entry.name, entry.stat().st_mtime, entry.stat().st_size) for entry in entries))
+
+@st.cache_data(show_spinner=False)
+def _zip_output(dir_path, stamp):
+    """Bundle every file in the output directory into one in-memory ZIP archive."""
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as z:
+        for root, _, fs in os.walk(dir_path):
+            for f in sorted(fs):
+                file_path = os.path.join(root, f)
+                z.write(file_path, arcname=os.path.relpath(file_path, dir_path))
+    return buf.getvalue()
+
+def _safe_scandir(path):
+    """Entries of the directory at path, or None if it is missing or not a directory."""
+    try:
+        with os.scandir(path) as it:
+            return list(it)
+    except OSError:
+        return None
+
+def _scan_output_files(entries):
+    """(name, mtime) of the regular files among scandir entries, sorted by name."""
+    return sorted((entry.name, entry.stat().st_mtime) for entry in entries if entry.is_file())
+
+def _read_text(path: str) -> str:
+    """Read a chapter file, returning an error note instead of raising."""
+    try:
+        return Path(path).read_text(encoding="utf-8")
+    except Exception as e:
+        return f"Error reading file: {str(e)}"
+
+@st.cache_data(show_spinner=False)
+def _read_md(path: str, mtime: float) -> str:
+    """Read a chapter file; cached until its mtime changes."""
+    return _read_text(path)
+
+@st.cache_data(show_spinner=False)
+def _combine_markdown(dir_path, file_stamps):
+    """Combined tutorial text for the given (file, mtime) pairs; cached until any of them changes."""
+    files = [f for f, _ in file_stamps]
+    # Read the chapters concurrently so slow storage costs ~one read, not N
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        contents = pool.map(_read_text, [os.path.join(dir_path, f) for f in files])
+    file_contents = dict(zip(files, contents))
+    combined_content, _ = create_combined_markdown(file_contents)
+    return combined_content
+
+class _ConversionFailed(Exception):
+    """Raised inside the cached renderers so a failed conversion is retried instead of cached."""
+
+@st.cache_data(show_spinner="Rendering tutorial...")
+def _render_html(content_hash, _content):
+    """Standalone HTML page for the combined tutorial (see markdown_to_html), rendered once per content hash."""
+    html_content = markdown_to_html(_content)
+    if not html_content:
+        raise _ConversionFailed("HTML rendering failed")
+    return html_content
+
+@st.cache_data(show_spinner=False)
+def _build_pdf(content_hash, _content, out_path, _html=None):
+    """Convert the combined tutorial to PDF once per content hash and output path (underscore args are not hashed).
+
+    When the page already rendered _html, it goes straight to html_to_pdf instead of being rendered again.
+    """
+    pdf_path = html_to_pdf(_html, out_path) if _html else markdown_to_pdf(_content, out_path)
+    if not pdf_path:
+        raise _ConversionFailed("no PDF was produced")
+    return pdf_path
+
+def _get_pdf(content_hash, content, out_path, html=None):
+    """_build_pdf, redone if the PDF it cached has since been deleted from disk."""
+    pdf_path = _build_pdf(content_hash, content, out_path, html)
+    if not os.path.exists(pdf_path):
+        _build_pdf.clear()
+        pdf_path = _build_pdf(content_hash, content, out_path, html)
+    return pdf_path
+
+def _render_markdown(content, expander_label="Show full content"):
+    """st.markdown that truncates oversized content instead of stalling the browser."""
+    if len(content) > MD_HARD_LIMIT:
+        st.warning("This content is too large to render as markdown; showing the beginning as plain text. Download the file for the full version.")
+        st.text(content[:MD_SOFT_LIMIT])
+    elif len(content) > MD_SOFT_LIMIT:
+        st.markdown(content[:MD_SOFT_LIMIT])
+        with st.expander(expander_label):
+            st.markdown(content[MD_SOFT_LIMIT:])
+    else:
+        st.markdown(content)
+
+def _render_downloads(dir_path, entries):
+    """Emit the download buttons for a tutorial output directory (entries from _safe_scandir)."""
+    with st.expander("Download Tutorial Files", expanded=False):
+        st.download_button(
+            label="Download All Files (ZIP)",
+            data=_zip_output(dir_path, _output_stamp(entries)),
+            file_name=f"{os.path.basename(os.path.normpath(dir_path))}.zip",
+            mime="application/zip",
+            key="dl_zip"
+        )
+        
+        # Streamlit runs expander bodies even when collapsed, so gate the
+        # per-file buttons (and their file reads) behind an explicit toggle
+        if st.checkbox("Show individual files", key=f"show_files_{dir_path}"):
+            for entry in sorted((entry for entry in entries if entry.is_file()), key=lambda entry: entry.name):
+                # Chapters come from the cached reads; only other files hit the disk
+                if entry.name.endswith(".md"):
+                    data = _read_md(entry.path, entry.stat().st_mtime).encode("utf-8")
+                else:
+                    data = Path(entry.path).read_bytes()
+                st.download_button(
+                    label=f"Download {entry.name}",
+                    data=data,
+                    file_name=entry.name,
+                    mime=mimetypes.guess_type(entry.name)[0] or "application/octet-stream",
+                    key=f"dl_{entry.name}"
+                )
+
+def _render_complete_tutorial(output_dir, file_stamps):
+    """Render the combined tutorial view with its Markdown/HTML/PDF downloads."""
+    # Create combined content using our utility function (cached on the file stamps)
+    combined_content = _combine_markdown(output_dir, file_stamps)
+    combined_file_path = os.path.join(output_dir, "complete_tutorial.md")
+
+    if combined_content:
+        # Encode once; the same bytes feed the fingerprint, the download and the saved file
+        combined_bytes = combined_content.encode("utf-8")
+        
+        # Fingerprint of the combined text; unchanged content skips the writes and conversions below
+        content_hash = hashlib.blake2b(combined_bytes, digest_size=16).hexdigest()
+
+        # Add download buttons for markdown, served straight from memory
+        st.download_button(
+            label="Download Complete Tutorial (Markdown)",
+            data=combined_bytes,
+            file_name="complete_tutorial.md",
+            mime="text/markdown",
+            key="dl_complete_md"
+        )
+
+        # Only write the combined markdown to disk when asked for, not on every rerun
+        if st.button("Save combined markdown", key="build_combined_md"):
+            Path(combined_file_path).write_bytes(combined_bytes)
+
+        # Convert to HTML for better rendering
+        try:
+            html_content = _render_html(content_hash, combined_content)
+        except _ConversionFailed:
+            html_content = None
+        if html_content:
+            # Save HTML file, once per distinct content rather than on every rerun
+            html_file_path = os.path.join(output_dir, "complete_tutorial.html")
+            if st.session_state.get("html_written") != (html_file_path, content_hash):
+                with open(html_file_path, "w", encoding="utf-8") as f:
+                    f.write(html_content)
+                st.session_state["html_written"] = (html_file_path, content_hash)
+
+            # Add download button for HTML
+            st.download_button(
+                label="Download Complete Tutorial (HTML)",
+                data=html_content.encode("utf-8"),
+                file_name="complete_tutorial.html",
+                mime="text/html",
+                key="dl_complete_html"
+            )
+
+        # Convert to PDF only on request, in the background worker pool so the
+        # rest of the page renders meanwhile; unchanged content reuses the cached conversion
+        pdf_job = st.session_state.get("pdf_job")
+        if st.button("Prepare PDF", key="prepare_pdf") and (pdf_job is None or pdf_job[0] != content_hash or pdf_job[1].done()):
+            # Create a file for the PDF
+            pdf_file_path = os.path.join(output_dir, "complete_tutorial.pdf")
+            pdf_job = (content_hash, _get_pdf_executor().submit(_get_pdf, content_hash, combined_content, pdf_file_path, html_content))
+            st.session_state["pdf_job"] = pdf_job
+
+        if pdf_job is not None and pdf_job[0] == content_hash:
+            pdf_future = pdf_job[1]
+            if not pdf_future.done():
+                st.info("PDF still building...")
+                st.button("Check again", key="pdf_refresh")
+            else:
+                try:
+                    # Collect the finished conversion
+                    pdf_path = pdf_future.result()
+
+                    if pdf_path and os.path.exists(pdf_path):
+                        with open(pdf_path, "rb") as f:
+                            st.download_button(
+                                label="Download Complete Tutorial (PDF)",
+                                data=f,
+                                file_name="complete_tutorial.pdf",
+                                mime="application/pdf",
+                                key="dl_complete_pdf"
+                            )
+                    else:
+                        st.warning("PDF conversion failed. Please download the HTML or markdown version instead.")
+                except Exception as e:
+                    st.warning(f"PDF conversion failed: {str(e)}. Please download the HTML or markdown version instead.")
+
+        # Display the combined content with proper rendering
+        st.markdown("## Complete Tutorial")
+        st.markdown("This tab shows all chapters combined into a single document.")
+
+        # Use HTML display for better rendering of Mermaid diagrams
+        if html_content:
+            st.components.v1.html(html_content, height=800, scrolling=True)
+        else:
+            # Rendering failed; fall back to regular markdown display
+            _render_markdown(combined_content, "Show full tutorial")
+    else:
+        st.error("Failed to create combined tutorial content.")
+
+def _split_tokens(text):
+    """GitHub tokens from a comma- and/or whitespace-separated string."""
+    return [token for token in text.replace(",", " ").split() if token]
+
+def _run_key(shared):
+    """Inputs that identify a tutorial run; equal keys produce the same tutorial."""
+    return (
+        shared["repo_url"],
+        shared["project_name"],
+        shared["output_dir"],
+        shared["max_file_size"],
+        frozenset(shared["include_patterns"]),
+        frozenset(shared["exclude_patterns"]),
+    )
+
+def _start_flow(shared):
+    """Start the tutorial flow in the background worker, replacing the previous run."""
+    # Report node progress from the worker thread through this queue
+    shared["progress_queue"] = queue.Queue()
+    
+    # Drop the previous run's output; it is replaced once this run finishes
+    st.session_state.pop("last_result", None)
+    st.session_state.pop("last_shared", None)
+    st.session_state.pop("last_run_key", None)
+    
+    # Run the flow in a background worker so the UI stays responsive
+    st.session_state["flow_shared"] = shared
+    # Taken before the run; FetchRepo fills in a derived project_name
+    st.session_state["flow_run_key"] = _run_key(shared)
+    st.session_state["flow_progress"] = ("Starting tutorial generation...", 10)
+    st.session_state["flow_future"] = _get_executor().submit(_get_flow().run, shared)
+
+def render_tutorial_output(output_dir, entries=None):
+    """Render the chapter viewer, downloads and combined tutorial for one output directory.
+
+    entries may carry an existing _safe_scandir(output_dir) result so the
+    directory is listed only once per rerun.
+    """
+    st.markdown("### Tutorial Content")
+    if entries is None:
+        entries = _safe_scandir(output_dir) or []
+    # Skip the combined outputs written below so reruns don't fold them back in
+    stamps = [(f, mtime) for f, mtime in _scan_output_files(entries)
+              if not f.startswith("complete_tutorial.")]
+    files = [f for f, _ in stamps]
+    if files:
+        # Download buttons for the generated files
+        _render_downloads(output_dir, entries)
+
+        # (file, mtime) stamps key the cached reads below
+        file_stamps = tuple((f, mtime) for f, mtime in stamps if f.endswith('.md'))
+        file_mtimes = dict(file_stamps)
+
+        # One entry per file plus a "Complete Tutorial" view; only the selected
+        # one is rendered, so a single markdown tree is mounted at a time
+        active = st.selectbox(
+            "Chapter",
+            files + ["Complete Tutorial"],
+            format_func=lambda f: f.replace('.md', ''),
+            key="active_tab"
+        )
+        if active == "Complete Tutorial":
+            _render_complete_tutorial(output_dir, file_stamps)
+        elif active in file_mtimes:
+            # Display the markdown content
+            _render_markdown(_read_md(os.path.join(output_dir, active), file_mtimes[active]), "Show full chapter")
+    else:
+        st.info("No files found in the output directory.")
 
 # Set page config
 st.set_page_config(
@@ -41,12 +413,12 @@ Simply provide a GitHub repository URL and customize the generation settings.
 with st.sidebar:
     st.header("Configuration")
     
-    # GitHub token input
-    github_token = st.text_input(
-        "GitHub Token (optional)", 
-        value=os.environ.get("GITHUB_TOKEN", ""),
+    # GitHub token input (several tokens are rotated to spread the rate limit). Never
+    # pre-filled: the server's own GITHUB_TOKENS/GITHUB_TOKEN are used when it is left empty
+    github_tokens_str = st.text_input(
+        "GitHub Tokens (optional)", 
         type="password",
-        help="Personal access token for GitHub API. Helps avoid rate limits."
+        help="Personal access tokens for GitHub API, separated by commas or spaces. Requests rotate through them to avoid rate limits."
     )
     
     # Output directory
@@ -69,17 +441,20 @@ with st.sidebar:
         # Include patterns
         include_patterns_str = st.text_area(
             "Include Patterns", 
-            value="\n".join(DEFAULT_INCLUDE_PATTERNS),
+            value=_INCLUDE_DEFAULT_STR,
             help="File patterns to include (one per line)"
         )
         
         # Exclude patterns
         exclude_patterns_str = st.text_area(
             "Exclude Patterns", 
-            value="\n".join(DEFAULT_EXCLUDE_PATTERNS),
+            value=_EXCLUDE_DEFAULT_STR,
             help="File patterns to exclude (one per line)"
         )
 
+# A generation is still running for this session until its future has been collected below
+run_pending = "flow_future" in st.session_state
+
 # Main form
 with st.form("tutorial_form"):
     # Repository URL
@@ -95,31 +470,49 @@ with st.form("tutorial_form"):
         help="Custom name for the project (derived from URL if omitted)"
     )
     
+    # Reuse is the default for an identical re-submit; this forces a fresh run
+    force_regenerate = st.checkbox(
+        "Regenerate even if this repository was just processed",
+        value=False
+    )
+    
     # Submit button
-    submit_button = st.form_submit_button("Generate Tutorial")
+    # One run per session at a time: a second flow would write to the same output directory
+    submit_button = st.form_submit_button("Generate Tutorial", disabled=run_pending)
 
 # Process form submission
 if submit_button:
-    if not repo_url:
+    if "flow_future" in st.session_state:
+        st.warning("A tutorial is already being generated; wait for it to finish before starting another.")
+    elif not repo_url:
         st.error("Please enter a GitHub repository URL")
     else:
-        # Show progress
-        progress_bar = st.progress(0)
-        status_text = st.empty()
+        # Parse GitHub tokens, falling back to the pool configured on the server
+        github_tokens = _split_tokens(github_tokens_str) or _split_tokens(
+            os.environ.get("GITHUB_TOKENS") or os.environ.get("GITHUB_TOKEN", "")
+        )
         
         # Parse include/exclude patterns
-        include_patterns = set(filter(None, include_patterns_str.split("\n")))
-        exclude_patterns = set(filter(None, exclude_patterns_str.split("\n")))
+        include_patterns = _parse_patterns(include_patterns_str, _INCLUDE_DEFAULT_STR, DEFAULT_INCLUDE_PATTERNS)
+        exclude_patterns = _parse_patterns(exclude_patterns_str, _EXCLUDE_DEFAULT_STR, DEFAULT_EXCLUDE_PATTERNS)
+        
+        # Turn each pattern set into a single match predicate
+        include_match = _make_matcher(include_patterns)
+        exclude_match = _make_matcher(exclude_patterns)
         
         # Initialize shared dictionary
         shared = {
             "repo_url": repo_url,
             "project_name": project_name if project_name else None,
-            "github_token": github_token if github_token else os.environ.get("GITHUB_TOKEN"),
+            "github_token": github_tokens[0] if github_tokens else os.environ.get("GITHUB_TOKEN"),
+            "github_tokens": github_tokens,
             "output_dir": output_dir,
             "include_patterns": include_patterns,
             "exclude_patterns": exclude_patterns,
+            "include_match": include_match,
+            "exclude_match": exclude_match,
             "max_file_size": max_file_size,
+            "crawl_files": _crawl_repo_cached,
             "files": [],
             "abstractions": [],
             "relationships": {},
@@ -128,308 +521,79 @@ if submit_button:
             "final_output_dir": None
         }
         
-        try:
-            # Create and run the flow
-            status_text.text("Starting tutorial generation...")
-            progress_bar.progress(10)
-            
-            tutorial_flow = create_tutorial_flow()
-            
-            # Update status for each node
-            status_text.text("Fetching repository...")
-            progress_bar.progress(20)
-            
-            # Run the flow with progress updates
-            # Note: In a real implementation, you would need to modify the flow
-            # to provide progress updates or use callbacks
-            try:
-                result = tutorial_flow.run(shared)
-                
-                progress_bar.progress(100)
-                status_text.text("Tutorial generation complete!")
-                
-                # Display result
-                if result and result.get("final_output_dir"):
-                    output_dir = result["final_output_dir"]
-                    st.success(f"Tutorial generated successfully in: {output_dir}")
-                    
-                    # Check if output directory exists
-                    if os.path.exists(output_dir) and os.path.isdir(output_dir):
-                        st.markdown("### Tutorial Content")
-                        files = sorted(os.listdir(output_dir))
-                        if files:
-                            # Create tabs for each file plus a "Complete Tutorial" tab
-                            tab_names = [f.replace('.md', '') for f in files]
-                            tab_names.append("Complete Tutorial")
-                            tabs = st.tabs(tab_names)
-                            
-                            # Prepare combined content for the complete tutorial
-                            combined_content = ""
-                            file_contents = {}
-                            
-                            # First, read all file contents
-                            for file in files:
-                                file_path = os.path.join(output_dir, file)
-                                if os.path.isfile(file_path) and file.endswith('.md'):
-                                    try:
-                                        with open(file_path, "r", encoding="utf-8") as f:
-                                            file_contents[file] = f.read()
-                                    except Exception as e:
-                                        file_contents[file] = f"Error reading file: {str(e)}"
-                            
-                            # Process individual tabs
-                            for i, file in enumerate(files):
-                                if file in file_contents:
-                                    content = file_contents[file]
-                                    
-                                    # Display the content in the corresponding tab
-                                    with tabs[i]:
-                                        # Add download button at the top
-                                        with open(os.path.join(output_dir, file), "rb") as f:
-                                            st.download_button(
-                                                label=f"Download {file}",
-                                                data=f,
-                                                file_name=file,
-                                                mime="text/markdown"
-                                            )
-                                        
-                                        # Display the markdown content
-                                        st.markdown(content)
-                            
-                            # Create combined content using our utility function
-                            combined_content, combined_file_path = create_combined_markdown(
-                                file_contents, 
-                                os.path.join(output_dir, "complete_tutorial.md")
-                            )
-                            
-                            # Display the complete tutorial tab
-                            with tabs[-1]:
-                                if combined_content and combined_file_path:
-                                    # Add download buttons for markdown
-                                    with open(combined_file_path, "rb") as f:
-                                        st.download_button(
-                                            label="Download Complete Tutorial (Markdown)",
-                                            data=f,
-                                            file_name="complete_tutorial.md",
-                                            mime="text/markdown"
-                                        )
-                                    
-                                    # Convert to HTML for better rendering
-                                    html_content = markdown_to_html(combined_content)
-                                    if html_content:
-                                        # Save HTML file
-                                        html_file_path = os.path.join(output_dir, "complete_tutorial.html")
-                                        with open(html_file_path, "w", encoding="utf-8") as f:
-                                            f.write(html_content)
-                                        
-                                        # Add download button for HTML
-                                        with open(html_file_path, "rb") as f:
-                                            st.download_button(
-                                                label="Download Complete Tutorial (HTML)",
-                                                data=f,
-                                                file_name="complete_tutorial.html",
-                                                mime="text/html"
-                                            )
-                                    
-                                    # Convert to PDF and add PDF download button
-                                    try:
-                                        with st.spinner("Converting to PDF..."):
-                                            # Create a file for the PDF
-                                            pdf_file_path = os.path.join(output_dir, "complete_tutorial.pdf")
-                                            
-                                            # Convert markdown to PDF
-                                            pdf_path = markdown_to_pdf(combined_content, pdf_file_path)
-                                            
-                                            if pdf_path and os.path.exists(pdf_path):
-                                                with open(pdf_path, "rb") as f:
-                                                    st.download_button(
-                                                        label="Download Complete Tutorial (PDF)",
-                                                        data=f,
-                                                        file_name="complete_tutorial.pdf",
-                                                        mime="application/pdf"
-                                                    )
-                                            else:
-                                                st.warning("PDF conversion failed. Please download the HTML or markdown version instead.")
-                                    except Exception as e:
-                                        st.warning(f"PDF conversion failed: {str(e)}. Please download the HTML or markdown version instead.")
-                                    
-                                    # Display the combined content with proper rendering
-                                    st.markdown("## Complete Tutorial")
-                                    st.markdown("This tab shows all chapters combined into a single document.")
-                                    
-                                    # Use HTML display for better rendering of Mermaid diagrams
-                                    if html_content:
-                                        st.components.v1.html(html_content, height=800, scrolling=True)
-                                    else:
-                                        # Fallback to regular markdown display
-                                        st.markdown(combined_content)
-                                else:
-                                    st.error("Failed to create combined tutorial content.")
-                        else:
-                            st.info("No files found in the output directory.")
-                    else:
-                        # If the directory doesn't exist, try to find it in the output base directory
-                        output_base_dir = shared.get("output_dir", "output")
-                        project_name = shared.get("project_name", "")
-                        
-                        # Try to find the project directory in the output base directory
-                        if os.path.exists(output_base_dir) and os.path.isdir(output_base_dir):
-                            project_dirs = [d for d in os.listdir(output_base_dir) 
-                                           if os.path.isdir(os.path.join(output_base_dir, d))]
-                            
-                            if project_name and project_name in project_dirs:
-                                # Found the project directory
-                                actual_output_dir = os.path.join(output_base_dir, project_name)
-                                st.success(f"Found output directory at: {actual_output_dir}")
-                                
-                                # List files for download and viewing
-                                st.markdown("### Tutorial Content")
-                                files = sorted(os.listdir(actual_output_dir))
-                                if files:
-                                    # Create tabs for each file plus a "Complete Tutorial" tab
-                                    tab_names = [f.replace('.md', '') for f in files]
-                                    tab_names.append("Complete Tutorial")
-                                    tabs = st.tabs(tab_names)
-                                    
-                                    # Prepare combined content for the complete tutorial
-                                    combined_content = ""
-                                    file_contents = {}
-                                    
-                                    # First, read all file contents
-                                    for file in files:
-                                        file_path = os.path.join(actual_output_dir, file)
-                                        if os.path.isfile(file_path) and file.endswith('.md'):
-                                            try:
-                                                with open(file_path, "r", encoding="utf-8") as f:
-                                                    file_contents[file] = f.read()
-                                            except Exception as e:
-                                                file_contents[file] = f"Error reading file: {str(e)}"
-                                    
-                                    # Process individual tabs
-                                    for i, file in enumerate(files):
-                                        if file in file_contents:
-                                            content = file_contents[file]
-                                            
-                                            # Display the content in the corresponding tab
-                                            with tabs[i]:
-                                                # Add download button at the top
-                                                with open(os.path.join(actual_output_dir, file), "rb") as f:
-                                                    st.download_button(
-                                                        label=f"Download {file}",
-                                                        data=f,
-                                                        file_name=file,
-                                                        mime="text/markdown"
-                                                    )
-                                                
-                                                # Display the markdown content
-                                                st.markdown(content)
-                                    
-                                    # Create combined content using our utility function
-                                    combined_content, combined_file_path = create_combined_markdown(
-                                        file_contents, 
-                                        os.path.join(actual_output_dir, "complete_tutorial.md")
-                                    )
-                                    
-                                    # Display the complete tutorial tab
-                                    with tabs[-1]:
-                                        if combined_content and combined_file_path:
-                                            # Add download buttons for markdown
-                                            with open(combined_file_path, "rb") as f:
-                                                st.download_button(
-                                                    label="Download Complete Tutorial (Markdown)",
-                                                    data=f,
-                                                    file_name="complete_tutorial.md",
-                                                    mime="text/markdown"
-                                                )
-                                            
-                                            # Convert to HTML for better rendering
-                                            html_content = markdown_to_html(combined_content)
-                                            if html_content:
-                                                # Save HTML file
-                                                html_file_path = os.path.join(actual_output_dir, "complete_tutorial.html")
-                                                with open(html_file_path, "w", encoding="utf-8") as f:
-                                                    f.write(html_content)
-                                                
-                                                # Add download button for HTML
-                                                with open(html_file_path, "rb") as f:
-                                                    st.download_button(
-                                                        label="Download Complete Tutorial (HTML)",
-                                                        data=f,
-                                                        file_name="complete_tutorial.html",
-                                                        mime="text/html"
-                                                    )
-                                            
-                                            # Convert to PDF and add PDF download button
-                                            try:
-                                                with st.spinner("Converting to PDF..."):
-                                                    # Create a file for the PDF
-                                                    pdf_file_path = os.path.join(actual_output_dir, "complete_tutorial.pdf")
-                                                    
-                                                    # Convert markdown to PDF
-                                                    pdf_path = markdown_to_pdf(combined_content, pdf_file_path)
-                                                    
-                                                    if pdf_path and os.path.exists(pdf_path):
-                                                        with open(pdf_path, "rb") as f:
-                                                            st.download_button(
-                                                                label="Download Complete Tutorial (PDF)",
-                                                                data=f,
-                                                                file_name="complete_tutorial.pdf",
-                                                                mime="application/pdf"
-                                                            )
-                                                    else:
-                                                        st.warning("PDF conversion failed. Please download the HTML or markdown version instead.")
-                                            except Exception as e:
-                                                st.warning(f"PDF conversion failed: {str(e)}. Please download the HTML or markdown version instead.")
-                                            
-                                            # Display the combined content with proper rendering
-                                            st.markdown("## Complete Tutorial")
-                                            st.markdown("This tab shows all chapters combined into a single document.")
-                                            
-                                            # Use HTML display for better rendering of Mermaid diagrams
-                                            if html_content:
-                                                st.components.v1.html(html_content, height=800, scrolling=True)
-                                            else:
-                                                # Fallback to regular markdown display
-                                                st.markdown(combined_content)
-                                        else:
-                                            st.error("Failed to create combined tutorial content.")
-                                else:
-                                    st.info("No files found in the output directory.")
-                            else:
-                                # List all available project directories
-                                if project_dirs:
-                                    st.warning(f"Output directory '{output_dir}' not found, but found these project directories:")
-                                    for dir_name in project_dirs:
-                                        dir_path = os.path.join(output_base_dir, dir_name)
-                                        st.info(f"- {dir_path}")
-                                else:
-                                    st.warning(f"Output directory '{output_dir}' not found and no project directories found in {output_base_dir}")
-                        else:
-                            st.warning(f"Output directory not found or not accessible: {output_dir}")
-                else:
-                    # Try to find any output directories
-                    output_base_dir = shared.get("output_dir", "output")
-                    if os.path.exists(output_base_dir) and os.path.isdir(output_base_dir):
-                        project_dirs = [d for d in os.listdir(output_base_dir) 
-                                       if os.path.isdir(os.path.join(output_base_dir, d))]
-                        if project_dirs:
-                            st.success("Tutorial generation completed! Found these output directories:")
-                            for dir_name in project_dirs:
-                                dir_path = os.path.join(output_base_dir, dir_name)
-                                st.info(f"- {dir_path}")
-                        else:
-                            st.warning(f"Tutorial generation completed but no output directories found in {output_base_dir}")
-                    else:
-                        st.warning("Tutorial generation completed but output directory not found.")
-            except Exception as e:
-                progress_bar.progress(100)
-                status_text.text("Tutorial generation failed!")
-                st.error(f"Error generating tutorial: {str(e)}")
-                st.exception(e)
-                
-        except Exception as e:
-            st.error(f"Error generating tutorial: {str(e)}")
-            st.exception(e)
+        # Identical re-submits reuse the finished run kept in session state
+        if (not force_regenerate and "last_shared" in st.session_state
+                and st.session_state.get("last_run_key") == _run_key(shared)):
+            st.info("Showing the tutorial already generated for this repository and settings.")
+        else:
+            _start_flow(shared)
+
+# Poll a running (or just finished) tutorial generation
+if "flow_future" in st.session_state:
+    future = st.session_state["flow_future"]
+    shared = st.session_state["flow_shared"]
+    
+    # Drain progress events pushed by the nodes without blocking
+    progress_queue = shared["progress_queue"]
+    while not progress_queue.empty():
+        st.session_state["flow_progress"] = progress_queue.get_nowait()
+    message, percent = st.session_state["flow_progress"]
+    # Every worker is busy with other sessions' runs; this one starts when a worker frees up
+    if not future.running() and not future.done():
+        message = "Queued: waiting for other tutorial runs to finish..."
+    progress_bar = st.progress(percent)
+    status_text = st.empty()
+    status_text.text(message)
+    
+    if not future.done():
+        time.sleep(0.5)
+        st.rerun()
+    
+    del st.session_state["flow_future"]
+    try:
+        result = future.result()
+    except Exception as e:
+        progress_bar.progress(100)
+        status_text.text("Tutorial generation failed!")
+        st.error(f"Error generating tutorial: {str(e)}")
+        st.exception(e)
+    else:
+        progress_bar.progress(100)
+        status_text.text("Tutorial generation complete!")
+        
+        # Keep the finished run so later reruns (tab switches, downloads) can render it
+        st.session_state["last_result"] = result
+        st.session_state["last_shared"] = shared
+        st.session_state["last_run_key"] = st.session_state["flow_run_key"]
+
+# Render the most recent finished run; nothing is regenerated on reruns
+if "last_shared" in st.session_state and "flow_future" not in st.session_state:
+    result = st.session_state["last_result"]
+    shared = st.session_state["last_shared"]
+    
+    # Locate the output directory: the flow result, else a project dir under the base dir
+    output_base_dir = shared.get("output_dir", "output")
+    output_dir = result.get("final_output_dir") if isinstance(result, dict) else None
+    output_dir = output_dir or shared.get("final_output_dir")
+    # One scandir both checks the directory and lists it for the render below
+    output_entries = _safe_scandir(output_dir) if output_dir else None
+    if output_entries is None:
+        # One pass over the base dir finds the project and lists the others for the warning below
+        output_dir, project_dirs = find_project_dir(output_base_dir, shared.get("project_name"), fallback=False)
+    
+    if output_dir:
+        st.success(f"Tutorial generated successfully in: {output_dir}")
+        
+        render_tutorial_output(output_dir, output_entries)
+    else:
+        # List all available project directories
+        if project_dirs:
+            st.warning(f"Tutorial output directory not found, but found these project directories in {output_base_dir}:")
+            for dir_name in project_dirs:
+                st.info(f"- {os.path.join(output_base_dir, dir_name)}")
+        else:
+            st.warning(f"Tutorial generation completed but no output directories found in {output_base_dir}")
+
 
 # Display information about the app
 st.markdown("---")
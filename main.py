@@ -7,17 +7,17 @@ from flow import create_tutorial_flow
 dotenv.load_dotenv()
 
 # Default file patterns
-DEFAULT_INCLUDE_PATTERNS = {
+DEFAULT_INCLUDE_PATTERNS = frozenset({
     "*.py", "*.js", "*.ts", "*.go", "*.java", "*.pyi", "*.pyx", 
     "*.c", "*.cc", "*.cpp", "*.h", "*.md", "*.rst", "Dockerfile", 
     "Makefile", "*.yaml", "*.yml"
-}
+})
 
-DEFAULT_EXCLUDE_PATTERNS = {
+DEFAULT_EXCLUDE_PATTERNS = frozenset({
     "*test*", "tests/*", "docs/*", "examples/*", "v1/*", 
     "dist/*", "build/*", "experimental/*", "deprecated/*", 
     "legacy/*", ".git/*", ".github/*"
-}
+})
 
 # --- Main Function ---
 def main():
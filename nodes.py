@@ -15,6 +15,12 @@ def create_llm_context(files_data):
 
     return context, file_info # file_info is list of (index, path)
 
+# Helper to push a progress event to the UI, if one is listening (see app.py)
+def report_progress(shared, message, percent):
+    progress_queue = shared.get("progress_queue")
+    if progress_queue is not None:
+        progress_queue.put((message, percent))
+
 # Helper to get content for specific file indices
 def get_content_for_indices(files_data, indices):
     content_map = {}
@@ -26,6 +32,7 @@ def get_content_for_indices(files_data, indices):
 
 class FetchRepo(Node):
     def prep(self, shared):
+        report_progress(shared, "Fetching repository...", 20)
         repo_url = shared["repo_url"]
         project_name = shared.get("project_name")
         if not project_name:
@@ -41,19 +48,28 @@ class FetchRepo(Node):
         return {
             "repo_url": repo_url,
             "token": shared.get("github_token"),
+            "tokens": shared.get("github_tokens"),
             "include_patterns": include_patterns,
             "exclude_patterns": exclude_patterns,
+            # Optional prebuilt pattern predicates (set by app.py)
+            "include_match": shared.get("include_match"),
+            "exclude_match": shared.get("exclude_match"),
             "max_file_size": max_file_size,
-            "use_relative_paths": True
+            "use_relative_paths": True,
+            # Optional crawl_github_files replacement (app.py passes a cached one)
+            "crawl_files": shared.get("crawl_files", crawl_github_files)
         }
 
     def exec(self, prep_res):
         print(f"Crawling repository: {prep_res['repo_url']}...")
-        result = crawl_github_files(
+        result = prep_res["crawl_files"](
             repo_url=prep_res["repo_url"],
             token=prep_res["token"],
+            tokens=prep_res["tokens"],
             include_patterns=prep_res["include_patterns"],
             exclude_patterns=prep_res["exclude_patterns"],
+            include_match=prep_res["include_match"],
+            exclude_match=prep_res["exclude_match"],
             max_file_size=prep_res["max_file_size"],
             use_relative_paths=prep_res["use_relative_paths"]
         )
@@ -67,6 +83,7 @@ class FetchRepo(Node):
 
 class IdentifyAbstractions(Node):
     def prep(self, shared):
+        report_progress(shared, "Identifying abstractions...", 35)
         files_data = shared["files"]
         project_name = shared["project_name"]  # Get project name
         context, file_info = create_llm_context(files_data)
@@ -162,6 +179,7 @@ Format the output as a YAML list of dictionaries:
 
 class AnalyzeRelationships(Node):
     def prep(self, shared):
+        report_progress(shared, "Analyzing relationships...", 50)
         abstractions = shared["abstractions"] # Now contains 'files' list of indices
         files_data = shared["files"]
         project_name = shared["project_name"]  # Get project name
@@ -285,6 +303,7 @@ Now, provide the YAML output:
 
 class OrderChapters(Node):
     def prep(self, shared):
+        report_progress(shared, "Ordering chapters...", 60)
         abstractions = shared["abstractions"]
         relationships = shared["relationships"]
         project_name = shared["project_name"]  # Get project name
@@ -375,6 +394,7 @@ Now, provide the YAML output:
 
 class WriteChapters(BatchNode):
     def prep(self, shared):
+        report_progress(shared, "Writing chapters...", 70)
         chapter_order = shared["chapter_order"] # List of indices
         abstractions = shared["abstractions"]   # List of dicts, now using 'files' with indices
         files_data = shared["files"]
@@ -532,6 +552,7 @@ Now, directly provide a super beginner-friendly Markdown output (DON'T need ```m
 
 class CombineTutorial(Node):
     def prep(self, shared):
+        report_progress(shared, "Combining tutorial...", 90)
         project_name = shared["project_name"]
         output_base_dir = shared.get("output_dir", "output") # Default output dir
         output_path = os.path.join(output_base_dir, project_name)
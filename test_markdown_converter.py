@@ -1,22 +1,13 @@
 import os
 from utils.markdown_converter import markdown_to_html, markdown_to_pdf, create_combined_markdown, get_file_contents
+from utils.output_dirs import find_project_dir
 
-# Test directory
-output_dir = "output/GIM-BACK"
-
-# If the directory doesn't exist, try to find it
-if not os.path.exists(output_dir):
-    output_base_dir = "output"
-    if os.path.exists(output_base_dir) and os.path.isdir(output_base_dir):
-        project_dirs = [d for d in os.listdir(output_base_dir) 
-                       if os.path.isdir(os.path.join(output_base_dir, d))]
-        print(f"Available project directories: {project_dirs}")
-        if project_dirs:
-            output_dir = os.path.join(output_base_dir, project_dirs[0])
-            print(f"Using first available directory: {output_dir}")
+# Test directory: output/GIM-BACK, or the first project directory if it doesn't exist
+output_dir, project_dirs = find_project_dir("output", "GIM-BACK")
+print(f"Available project directories: {project_dirs}")
 
 # Check if output directory exists
-if os.path.exists(output_dir) and os.path.isdir(output_dir):
+if output_dir:
     print(f"Output directory exists: {output_dir}")
     
     # Get file contents
@@ -52,4 +43,4 @@ if os.path.exists(output_dir) and os.path.isdir(output_dir):
     else:
         print("Failed to create combined markdown")
 else:
-    print(f"Output directory does not exist: {output_dir}")
\ No newline at end of file
+    print("No project directories found under output")
\ No newline at end of file
@@ -1,37 +1,28 @@
 import os
+from utils.output_dirs import find_project_dir
 
-# Test directory
-output_dir = "output/GIM-BACK"
-
-# If the directory doesn't exist, try to find it
-if not os.path.exists(output_dir):
-    output_base_dir = "output"
-    if os.path.exists(output_base_dir) and os.path.isdir(output_base_dir):
-        project_dirs = [d for d in os.listdir(output_base_dir) 
-                       if os.path.isdir(os.path.join(output_base_dir, d))]
-        print(f"Available project directories: {project_dirs}")
-        if project_dirs:
-            output_dir = os.path.join(output_base_dir, project_dirs[0])
-            print(f"Using first available directory: {output_dir}")
+# Test directory: output/GIM-BACK, or the first project directory if it doesn't exist
+output_dir, project_dirs = find_project_dir("output", "GIM-BACK")
+print(f"Available project directories: {project_dirs}")
 
 # Check if output directory exists
-if os.path.exists(output_dir) and os.path.isdir(output_dir):
+if output_dir:
     print(f"Output directory exists: {output_dir}")
     
     # List files in the directory
-    files = sorted(os.listdir(output_dir))
-    print(f"Files in directory: {files}")
+    with os.scandir(output_dir) as it:
+        entries = sorted(it, key=lambda e: e.name)
+    print(f"Files in directory: {[e.name for e in entries]}")
     
     # Read and print the content of each file
-    for file in files:
-        file_path = os.path.join(output_dir, file)
-        if os.path.isfile(file_path):
+    for entry in entries:
+        if entry.is_file():
             try:
-                with open(file_path, "r", encoding="utf-8") as f:
+                with open(entry.path, "r", encoding="utf-8") as f:
                     content = f.read()
-                print(f"\n--- {file} ---")
+                print(f"\n--- {entry.name} ---")
                 print(f"First 100 characters: {content[:100]}...")
             except Exception as e:
-                print(f"Error reading file {file}: {str(e)}")
+                print(f"Error reading file {entry.name}: {str(e)}")
 else:
-    print(f"Output directory does not exist: {output_dir}")
\ No newline at end of file
+    print("No project directories found under output")
\ No newline at end of file
@@ -1,47 +1,32 @@
 import os
+from utils.output_dirs import find_project_dir
 
 # Test directory detection logic
 output_base_dir = "output"
 project_name = "GIM-BACK"
 
 # Test with non-existent directory
-non_existent_dir = "output/NON-EXISTENT"
-print(f"\nTesting with non-existent directory: {non_existent_dir}")
-if os.path.exists(non_existent_dir) and os.path.isdir(non_existent_dir):
-    print(f"Directory exists: {non_existent_dir}")
+non_existent_name = "NON-EXISTENT"
+print(f"\nTesting with non-existent directory: {os.path.join(output_base_dir, non_existent_name)}")
+found_dir, project_dirs = find_project_dir(output_base_dir, non_existent_name)
+if found_dir is None and not project_dirs:
+    print(f"Output base directory does not exist or is empty: {output_base_dir}")
 else:
-    print(f"Directory does not exist: {non_existent_dir}")
-    
-    # Try to find it in the output base directory
-    if os.path.exists(output_base_dir) and os.path.isdir(output_base_dir):
-        project_dirs = [d for d in os.listdir(output_base_dir) 
-                       if os.path.isdir(os.path.join(output_base_dir, d))]
-        
-        print(f"Available project directories: {project_dirs}")
-    else:
-        print(f"Output base directory does not exist: {output_base_dir}")
+    print(f"Available project directories: {project_dirs}")
 
 print("\nTesting with existing directory:")
 
-print(f"Checking if output directory exists: {output_base_dir}")
-if os.path.exists(output_base_dir) and os.path.isdir(output_base_dir):
-    print(f"Output base directory exists: {output_base_dir}")
-    
-    # List all directories in the output base directory
-    project_dirs = [d for d in os.listdir(output_base_dir) 
-                   if os.path.isdir(os.path.join(output_base_dir, d))]
-    
-    print(f"Found project directories: {project_dirs}")
+print(f"Checking for project directory: {project_name}")
+found_dir, project_dirs = find_project_dir(output_base_dir, project_name)
+print(f"Found project directories: {project_dirs}")
+
+if project_name in project_dirs:
+    # Found the project directory
+    print(f"Found project directory: {found_dir}")
     
-    if project_name and project_name in project_dirs:
-        # Found the project directory
-        actual_output_dir = os.path.join(output_base_dir, project_name)
-        print(f"Found project directory: {actual_output_dir}")
-        
-        # List files in the project directory
-        files = os.listdir(actual_output_dir)
-        print(f"Files in project directory: {files}")
-    else:
-        print(f"Project directory '{project_name}' not found in {output_base_dir}")
+    # List files in the project directory
+    with os.scandir(found_dir) as it:
+        files = [e.name for e in it]
+    print(f"Files in project directory: {files}")
 else:
-    print(f"Output base directory does not exist: {output_base_dir}")
\ No newline at end of file
+    print(f"Project directory '{project_name}' not found in {output_base_dir}")
@@ -1,8 +1,19 @@
-from google import genai
 import os
 import logging
 import json
+import asyncio
+import hashlib
+import mmap
+import sqlite3
+import threading
 from datetime import datetime
+from typing import List
+
+# orjson parses the legacy JSON cache much faster; fall back to the stdlib when it isn't installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Configure logging
 log_directory = os.getenv("LOG_DIR", "logs")
@@ -11,91 +22,332 @@ log_file = os.path.join(log_directory, f"llm_calls_{datetime.now().strftime('%Y%
 
 # Set up logger
 logger = logging.getLogger("llm_logger")
-logger.setLevel(logging.INFO)
+# Prompt and response bodies are logged at DEBUG; set LOG_LEVEL=DEBUG to record them
+logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
 logger.propagate = False  # Prevent propagation to root logger
 file_handler = logging.FileHandler(log_file)
 file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
 logger.addHandler(file_handler)
 
 # Cache configuration from environment variables
-cache_file = os.getenv("CACHE_FILE", "llm_cache.json")
+cache_file = os.getenv("CACHE_FILE", "llm_cache.json")  # legacy JSON cache, imported once
+# The database sits next to the JSON cache unless CACHE_DB says otherwise
+cache_db = os.getenv("CACHE_DB") or os.path.join(os.path.dirname(cache_file), "llm_cache.db")
 cache_enabled = os.getenv("CACHE_ENABLED", "true").lower() == "true"
 
+# Optional semantic cache: near-duplicate prompts reuse a cached response (needs numpy + sentence-transformers)
+semantic_cache_enabled = os.getenv("SEMANTIC_CACHE", "0").lower() in ("1", "true")
+semantic_cache_threshold = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.97"))
+semantic_cache_model = os.getenv("SEMANTIC_CACHE_MODEL", "all-MiniLM-L6-v2")
+
+# SQLite connection to the cache, opened on first use (False if that failed); shared
+# across threads, so guard it with _cache_lock
+_conn = None
+_cache_lock = threading.Lock()
+
+# Gemini settings don't change during a run; the client is built once and reused
+gemini_model = os.getenv("GEMINI_MODEL", "gemini-2.5-pro-exp-03-25")
+_client = None
+_client_lock = threading.Lock()
+
+def _cache_key(prompt):
+    """Fixed-size cache key for a prompt: 32 hex chars of BLAKE2b-128, however long the prompt."""
+    return hashlib.blake2b(prompt.encode('utf-8'), digest_size=16).hexdigest()
+
+def _loads(data):
+    return orjson.loads(data) if orjson else json.loads(data)
+
+def _loads_buffer(buffer):
+    """Parse JSON from a buffer (e.g. an mmap); orjson reads it in place."""
+    if orjson:
+        with memoryview(buffer) as view:
+            return orjson.loads(view)
+    return json.loads(buffer[:])
+
+def _read_legacy_cache():
+    """
+    Read the old JSON cache_file into a dict ({} if there is none).
+
+    Accepts both the single {prompt: response} document and the JSON-lines
+    form with one [prompt, response] array per line.
+    """
+    cache = {}
+    if os.path.exists(cache_file) and os.path.getsize(cache_file) > 0:
+        try:
+            # Parse from a read-only mapping of the file instead of copying it into a bytes buffer
+            with open(cache_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                try:
+                    # Common case: one JSON document
+                    entries = [_loads_buffer(mm)]
+                except ValueError:
+                    entries = [_loads(line) for line in iter(mm.readline, b"") if line.strip()]
+            for entry in entries:
+                if isinstance(entry, dict):
+                    cache.update(entry)
+                else:
+                    prompt, response = entry
+                    cache[prompt] = response
+        except Exception as e:
+            logger.warning("Failed to import legacy cache %s: %s", cache_file, e)
+    return cache
+
+def _get_conn():
+    """
+    Open (and on first creation, populate) the SQLite cache.
+
+    Returns None if the database can't be opened; the failure is logged once
+    and not retried, so the cache is simply off for the rest of the process.
+    """
+    global _conn
+    if _conn is None:
+        try:
+            conn = sqlite3.connect(cache_db, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS cache(key TEXT PRIMARY KEY, response TEXT)")
+            # Carry over the entries of an existing JSON cache into a fresh database
+            if conn.execute("SELECT 1 FROM cache LIMIT 1").fetchone() is None:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO cache VALUES (?, ?)",
+                    ((_cache_key(prompt), response) for prompt, response in _read_legacy_cache().items())
+                )
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.error("Cannot open cache database %s, caching is off: %s", cache_db, e)
+            _conn = False
+        else:
+            _conn = conn
+    return _conn or None
+
+# Embedding model plus the matrix of cached prompt vectors (and their cache keys), built on first semantic lookup
+_semantic_index = None
+
+def _get_semantic_index():
+    """Load the embedding model and the stored prompt embeddings (caller holds _cache_lock)."""
+    global _semantic_index
+    if _semantic_index is None:
+        import numpy as np
+        from sentence_transformers import SentenceTransformer
+
+        model = SentenceTransformer(semantic_cache_model)
+        conn = _get_conn()
+        conn.execute("CREATE TABLE IF NOT EXISTS embeddings(key TEXT PRIMARY KEY, vector BLOB)")
+        conn.commit()
+        rows = conn.execute(
+            "SELECT e.key, e.vector FROM embeddings e JOIN cache c ON c.key = e.key"
+        ).fetchall()
+        dim = model.get_sentence_embedding_dimension()
+        matrix = np.vstack([np.frombuffer(vector, dtype=np.float32) for _, vector in rows]) if rows \
+            else np.empty((0, dim), dtype=np.float32)
+        _semantic_index = {"model": model, "keys": [key for key, _ in rows], "matrix": matrix}
+    return _semantic_index
+
+def _semantic_lookup(prompt):
+    """
+    Return (embedding, cached response or None) for prompt.
+
+    Embeddings are normalized, so one matrix-vector product gives the cosine
+    similarity against every cached prompt at once. Prompts longer than the
+    model's input window are skipped (embedding None): the model would only
+    see their shared leading boilerplate, so different prompts would match.
+    """
+    with _cache_lock:
+        index = _get_semantic_index()
+        model = index["model"]
+        if len(model.tokenizer(prompt)["input_ids"]) > model.max_seq_length:
+            return None, None
+        embedding = model.encode(prompt, normalize_embeddings=True).astype("float32")
+        if not index["keys"]:
+            return embedding, None
+        scores = index["matrix"] @ embedding
+        best = int(scores.argmax())
+        if scores[best] < semantic_cache_threshold:
+            return embedding, None
+        row = _get_conn().execute("SELECT response FROM cache WHERE key = ?", (index["keys"][best],)).fetchone()
+    return embedding, row[0] if row else None
+
+def _semantic_add(key, embedding):
+    """Store a prompt embedding next to its cached response (caller holds _cache_lock)."""
+    import numpy as np
+
+    index = _get_semantic_index()
+    conn = _get_conn()
+    conn.execute("INSERT OR REPLACE INTO embeddings VALUES (?, ?)", (key, embedding.tobytes()))
+    conn.commit()
+    index["keys"].append(key)
+    index["matrix"] = np.vstack([index["matrix"], embedding])
+
+def _cache_lookup(prompt):
+    """
+    Look prompt up in the cache.
+
+    Returns (key, embedding, cached response or None); key and embedding are
+    handed back to _cache_store once the response is known.
+    """
+    # Indexed lookup in the SQLite cache
+    key = _cache_key(prompt)
+    cached = None
+    try:
+        with _cache_lock:
+            conn = _get_conn()
+            if conn is None:
+                return key, None, None
+            row = conn.execute("SELECT response FROM cache WHERE key = ?", (key,)).fetchone()
+        cached = row[0] if row else None
+    except Exception as e:
+        logger.warning("Failed to read cache: %s", e)
+    
+    # Fall back to the nearest cached prompt when semantic caching is on
+    embedding = None
+    if cached is None and semantic_cache_enabled:
+        try:
+            embedding, cached = _semantic_lookup(prompt)
+        except Exception as e:
+            logger.warning("Semantic cache lookup failed: %s", e)
+    
+    return key, embedding, cached
+
+def _cache_store(key, embedding, response_text):
+    """Add a response to the cache; a single row write instead of rewriting a file."""
+    try:
+        with _cache_lock:
+            conn = _get_conn()
+            if conn is None:
+                return
+            conn.execute("INSERT OR REPLACE INTO cache VALUES (?, ?)", (key, response_text))
+            conn.commit()
+            if embedding is not None:
+                _semantic_add(key, embedding)
+    except Exception as e:
+        logger.error("Failed to save cache: %s", e)
+
+def _make_client():
+    """Gemini client for the configured authentication."""
+    # Imported here so cache hits and unrelated imports of this module never load the Gemini SDK
+    from google import genai
+    
+    # Check if using API key or Vertex AI
+    api_key = os.getenv("GEMINI_API_KEY")
+    if api_key:
+        # Use API key authentication
+        return genai.Client(api_key=api_key)
+    # Use Vertex AI authentication
+    return genai.Client(
+        vertexai=True,
+        project=os.getenv("GEMINI_PROJECT_ID", "your-project-id"),
+        location=os.getenv("GEMINI_LOCATION", "us-central1")
+    )
+
+def _get_client():
+    """Shared Gemini client, so auth discovery and connections are reused across calls."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = _make_client()
+    return _client
+
 # By default, we use Google Gemini 2.5 pro, as it shows great performance for code understanding
-def call_llm(prompt: str, use_cache: bool = None) -> str:
+def call_llm_stream(prompt: str, use_cache: bool = None):
+    """
+    Yield the LLM response to prompt as it arrives.
+
+    A cache hit is yielded as a single chunk. Otherwise the streamed chunks
+    are joined once at the end and the full response is cached.
+    """
     # Determine if cache should be used (parameter overrides environment variable)
     if use_cache is None:
         use_cache = cache_enabled
     
     # Log the prompt
-    logger.info(f"PROMPT: {prompt}")
+    logger.debug("PROMPT: %s", prompt)
     
     # Check cache if enabled
     if use_cache:
-        # Load cache from disk
-        cache = {}
-        if os.path.exists(cache_file):
-            try:
-                with open(cache_file, 'r') as f:
-                    cache = json.load(f)
-            except Exception as e:
-                logger.warning(f"Failed to load cache, starting with empty cache: {e}")
+        key, embedding, cached = _cache_lookup(prompt)
         
         # Return from cache if exists
-        if prompt in cache:
-            logger.info(f"RESPONSE (cached): {cache[prompt]}")
-            return cache[prompt]
+        if cached is not None:
+            logger.debug("RESPONSE (cached): %s", cached)
+            yield cached
+            return
     
     # Call the LLM if not in cache or cache disabled
     try:
-        # Check if using API key or Vertex AI
-        api_key = os.getenv("GEMINI_API_KEY")
-        if api_key:
-            # Use API key authentication
-            client = genai.Client(api_key=api_key)
-        else:
-            # Use Vertex AI authentication
-            client = genai.Client(
-                vertexai=True,
-                project=os.getenv("GEMINI_PROJECT_ID", "your-project-id"),
-                location=os.getenv("GEMINI_LOCATION", "us-central1")
-            )
-            
-        model = os.getenv("GEMINI_MODEL", "gemini-2.5-pro-exp-03-25")
-        response = client.models.generate_content(
-            model=model,
+        chunks = []
+        for chunk in _get_client().models.generate_content_stream(
+            model=gemini_model,
             contents=[prompt]
-        )
-        response_text = response.text
+        ):
+            if chunk.text:
+                chunks.append(chunk.text)
+                yield chunk.text
+        response_text = "".join(chunks)
         
         # Log the response
-        logger.info(f"RESPONSE: {response_text}")
+        logger.debug("RESPONSE: %s", response_text)
         
         # Update cache if enabled
         if use_cache:
-            # Load cache again to avoid overwrites
-            cache = {}
-            if os.path.exists(cache_file):
-                try:
-                    with open(cache_file, 'r') as f:
-                        cache = json.load(f)
-                except Exception as e:
-                    logger.warning(f"Failed to reload cache: {e}")
-            
-            # Add to cache and save
-            cache[prompt] = response_text
-            try:
-                with open(cache_file, 'w') as f:
-                    json.dump(cache, f)
-            except Exception as e:
-                logger.error(f"Failed to save cache: {e}")
-        
-        return response_text
+            _cache_store(key, embedding, response_text)
     
     except Exception as e:
-        logger.error(f"Error calling Gemini API: {e}")
+        logger.error("Error calling Gemini API: %s", e)
         raise Exception(f"Failed to generate content with Gemini: {e}")
 
+def call_llm(prompt: str, use_cache: bool = None) -> str:
+    """Blocking wrapper around call_llm_stream that returns the whole response."""
+    return "".join(call_llm_stream(prompt, use_cache))
+
+def call_llm_batch(prompts: List[str], use_cache: bool = None) -> List[str]:
+    """
+    Answer several independent prompts, sending the uncached ones concurrently.
+
+    Cache hits are resolved first; the misses go out together through the
+    client's async API, so the wall time is roughly the slowest call rather
+    than the sum. Responses come back in prompt order.
+    """
+    if use_cache is None:
+        use_cache = cache_enabled
+    
+    responses = [None] * len(prompts)
+    pending = []  # (index, prompt, key, embedding)
+    for i, prompt in enumerate(prompts):
+        logger.debug("PROMPT: %s", prompt)
+        key = embedding = None
+        if use_cache:
+            key, embedding, cached = _cache_lookup(prompt)
+            if cached is not None:
+                logger.debug("RESPONSE (cached): %s", cached)
+                responses[i] = cached
+                continue
+        pending.append((i, prompt, key, embedding))
+    
+    if not pending:
+        return responses
+    
+    async def _generate_all():
+        # One client per batch: its async transport belongs to this event loop
+        client = _make_client()
+        return await asyncio.gather(*(
+            client.aio.models.generate_content(model=gemini_model, contents=[prompt])
+            for _, prompt, _, _ in pending
+        ))
+    
+    try:
+        results = asyncio.run(_generate_all())
+    except Exception as e:
+        logger.error("Error calling Gemini API: %s", e)
+        raise Exception(f"Failed to generate content with Gemini: {e}")
+    
+    for (i, _, key, embedding), result in zip(pending, results):
+        response_text = result.text
+        logger.debug("RESPONSE: %s", response_text)
+        if use_cache:
+            _cache_store(key, embedding, response_text)
+        responses[i] = response_text
+    
+    return responses
+
 # # Use Anthropic Claude 3.7 Sonnet Extended Thinking
 # def call_llm(prompt, use_cache: bool = True):
 #     from anthropic import Anthropic
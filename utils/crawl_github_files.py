@@ -5,16 +5,38 @@ import tempfile
 import git
 import time
 import fnmatch
-from typing import Union, Set, List, Dict, Tuple, Any
+import re
+from itertools import cycle
+from typing import Union, Set, List, Dict, Tuple, Any, Callable
 from urllib.parse import urlparse
 
+def compile_patterns(patterns):
+    """
+    Build a match predicate for a set of fnmatch-style globs.
+
+    No patterns gives None (accept all), a single pattern a plain fnmatchcase
+    check, and several patterns one precompiled regex union, so each file is
+    tested with a single regex scan instead of one fnmatch call per pattern.
+    """
+    if not patterns:
+        return None
+    if isinstance(patterns, str):
+        patterns = {patterns}
+    if len(patterns) == 1:
+        pattern = next(iter(patterns))
+        return lambda name: fnmatch.fnmatchcase(name, pattern)
+    return re.compile("|".join(f"(?:{fnmatch.translate(p)})" for p in sorted(patterns))).match
+
 def crawl_github_files(
     repo_url, 
     token=None, 
     max_file_size: int = 1 * 1024 * 1024,  # 1 MB
     use_relative_paths: bool = False,
     include_patterns: Union[str, Set[str]] = None,
-    exclude_patterns: Union[str, Set[str]] = None
+    exclude_patterns: Union[str, Set[str]] = None,
+    include_match: Callable[[str], Any] = None,
+    exclude_match: Callable[[str], Any] = None,
+    tokens: List[str] = None
 ):
     """
     Crawl files from a specific path in a GitHub repository at a specific commit.
@@ -32,30 +54,30 @@ def crawl_github_files(
                                                        If None, all files are included.
         exclude_patterns (str or set of str, optional): Pattern or set of patterns specifying which files to exclude.
                                                        If None, no files are excluded.
+        include_match (callable, optional): Prebuilt predicate for the include patterns (e.g. the `match` method of
+                                            a precompiled regex union). When omitted, one is compiled from
+                                            include_patterns with compile_patterns().
+        exclude_match (callable, optional): Prebuilt predicate for the exclude patterns, used the same way.
+        tokens (list of str, optional): Pool of GitHub tokens. API requests rotate through them round-robin,
+                                        multiplying the effective rate limit by the number of tokens.
 
     Returns:
         dict: Dictionary with files and statistics
     """
-    # Convert single pattern to set
-    if include_patterns and isinstance(include_patterns, str):
-        include_patterns = {include_patterns}
-    if exclude_patterns and isinstance(exclude_patterns, str):
-        exclude_patterns = {exclude_patterns}
+    # Compile the patterns once unless the caller already passed prebuilt matchers
+    if include_match is None:
+        include_match = compile_patterns(include_patterns)
+    if exclude_match is None:
+        exclude_match = compile_patterns(exclude_patterns)
 
     def should_include_file(file_path: str, file_name: str) -> bool:
         """Determine if a file should be included based on patterns"""
         # If no include patterns are specified, include all files
-        if not include_patterns:
-            include_file = True
-        else:
-            # Check if file matches any include pattern
-            include_file = any(fnmatch.fnmatch(file_name, pattern) for pattern in include_patterns)
+        include_file = include_match is None or bool(include_match(file_name))
 
         # If exclude patterns are specified, check if file should be excluded
-        if exclude_patterns and include_file:
-            # Exclude if file matches any exclude pattern
-            exclude_file = any(fnmatch.fnmatch(file_path, pattern) for pattern in exclude_patterns)
-            return not exclude_file
+        if exclude_match is not None and include_file:
+            return not exclude_match(file_path)
 
         return include_file
 
@@ -148,36 +170,28 @@ def crawl_github_files(
     
     # Setup for GitHub API
     headers = {"Accept": "application/vnd.github.v3+json"}
+    if tokens and not token:
+        token = tokens[0]
     if token:
         headers["Authorization"] = f"token {token}"
+    token_pool = cycle(tokens) if tokens else None
+
+    def request_headers():
+        """Headers for the next API request, rotating through the token pool if given"""
+        if token_pool is None:
+            return headers
+        return {**headers, "Authorization": f"token {next(token_pool)}"}
     
     # Dictionary to store path -> content mapping
     files = {}
     skipped_files = []
     
-    def should_include_file(file_path: str, file_name: str) -> bool:
-        """Determine if a file should be included based on patterns"""
-        # If no include patterns are specified, include all files
-        if not include_patterns:
-            include_file = True
-        else:
-            # Check if file matches any include pattern
-            include_file = any(fnmatch.fnmatch(file_name, pattern) for pattern in include_patterns)
-        
-        # If exclude patterns are specified, check if file should be excluded
-        if exclude_patterns and include_file:
-            # Exclude if file matches any exclude pattern
-            exclude_file = any(fnmatch.fnmatch(file_path, pattern) for pattern in exclude_patterns)
-            return not exclude_file
-        
-        return include_file
-    
     def fetch_contents(path):
         """Fetch contents of the repository at a specific path and commit"""
         url = f"https://api.github.com/repos/{owner}/{repo}/contents/{path}"
         params = {"ref": ref}
         
-        response = requests.get(url, headers=headers, params=params)
+        response = requests.get(url, headers=request_headers(), params=params)
         
         if response.status_code == 403 and 'rate limit exceeded' in response.text.lower():
             reset_time = int(response.headers.get('X-RateLimit-Reset', 0))
@@ -234,7 +248,7 @@ def crawl_github_files(
                 # For files, get raw content
                 if "download_url" in item and item["download_url"]:
                     file_url = item["download_url"]
-                    file_response = requests.get(file_url, headers=headers)
+                    file_response = requests.get(file_url, headers=request_headers())
                     
                     # Final size check in case content-length header is available but differs from metadata
                     content_length = int(file_response.headers.get('content-length', 0))
@@ -250,7 +264,7 @@ def crawl_github_files(
                         print(f"Failed to download {rel_path}: {file_response.status_code}")
                 else:
                     # Alternative method if download_url is not available
-                    content_response = requests.get(item["url"], headers=headers)
+                    content_response = requests.get(item["url"], headers=request_headers())
                     if content_response.status_code == 200:
                         content_data = content_response.json()
                         if content_data.get("encoding") == "base64" and "content" in content_data:
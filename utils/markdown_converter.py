@@ -1,52 +1,23 @@
 import os
+import re
+import json
+import time
+import socket
 import tempfile
 import subprocess
 import logging
 import base64
+import atexit
+import mmap
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
-def markdown_to_html(markdown_content):
-    """
-    Convert markdown content to HTML with proper rendering of code blocks and Mermaid diagrams.
-    
-    Args:
-        markdown_content (str): The markdown content to convert
-        
-    Returns:
-        str: The HTML content
-    """
-    try:
-        # Create a temporary file for the markdown content
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.md', delete=False) as temp_md:
-            temp_md.write(markdown_content)
-            temp_md_path = temp_md.name
-        
-        # Create a temporary file for the HTML output
-        with tempfile.NamedTemporaryFile(suffix='.html', delete=False) as temp_html:
-            temp_html_path = temp_html.name
-        
-        # Convert markdown to HTML using pandoc
-        cmd = [
-            'pandoc',
-            temp_md_path,
-            '-o', temp_html_path,
-            '--standalone',
-            '--highlight-style=tango',
-            '--toc',
-            '--toc-depth=3',
-            '--number-sections',
-            '-f', 'markdown+yaml_metadata_block+raw_html+fenced_divs+mermaid',
-            '--embed-resources',
-            '--mathjax',
-            '--template=default',
-            '--css', 'https://cdn.jsdelivr.net/npm/github-markdown-css/github-markdown.min.css',
-            '--include-in-header', '-'
-        ]
-        
-        # Add Mermaid script to the header
-        mermaid_script = """
+# Mermaid runtime and page styling, injected into the <head> of every generated page
+MERMAID_HEADER = """
         <script src="https://cdn.jsdelivr.net/npm/mermaid/dist/mermaid.min.js"></script>
         <script>
             document.addEventListener('DOMContentLoaded', function() {
@@ -94,13 +65,272 @@ def markdown_to_html(markdown_content):
             }
         </style>
         """
+
+# Render with pandoc instead of Python-Markdown (slower: one subprocess per conversion)
+use_pandoc = os.getenv("USE_PANDOC", "0") == "1"
+
+GITHUB_MARKDOWN_CSS = 'https://cdn.jsdelivr.net/npm/github-markdown-css/github-markdown.min.css'
+# Local copy of the stylesheet, inlined into every page: a copy shipped next to this
+# module if there is one, else one downloaded on first use into the user cache dir
+# (the package directory isn't writable in the Docker image)
+GITHUB_MARKDOWN_CSS_BUNDLED = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'github-markdown.min.css')
+GITHUB_MARKDOWN_CSS_PATH = os.path.join(
+    os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "tutorial-pdf", "github-markdown.min.css"
+)
+
+PANDOC_READER = 'markdown+yaml_metadata_block+raw_html+fenced_divs+mermaid'
+
+# pandoc options for a standalone HTML page (input/output and header are added per call)
+PANDOC_HTML_OPTIONS = [
+    '--standalone',
+    '--highlight-style=tango',
+    '--toc',
+    '--toc-depth=3',
+    '--number-sections',
+    '-f', PANDOC_READER,
+    '--mathjax',
+    '--template=default',
+]
+
+# The same conversion as a pandoc-server request (the header goes in as a template variable)
+PANDOC_SERVER_OPTIONS = {
+    'from': PANDOC_READER,
+    'to': 'html5',
+    'standalone': True,
+    'highlight-style': 'tango',
+    'table-of-contents': True,
+    'toc-depth': 3,
+    'number-sections': True,
+    'html-math-method': {'method': 'mathjax'},
+}
+
+# wkhtmltopdf page options (input/output are added per call)
+WKHTMLTOPDF_OPTIONS = [
+    '--enable-local-file-access',
+    '--javascript-delay', '1000',  # Wait for JavaScript to execute (for Mermaid)
+    '--no-stop-slow-scripts',
+    '--margin-top', '20',
+    '--margin-right', '20',
+    '--margin-bottom', '20',
+    '--margin-left', '20',
+    '--page-size', 'A4',
+    '--encoding', 'UTF-8',
+    '--footer-center', '[page]/[topage]',
+]
+
+# Complete argv lists, built once; per call only the input/output paths are filled in
+_PANDOC_CMD_TEMPLATE = ['pandoc', '<MD>', '-o', '<HTML>', *PANDOC_HTML_OPTIONS, '--include-in-header', '-']
+_PANDOC_PIPE_CMD = ['pandoc', '-', '-t', 'html', *PANDOC_HTML_OPTIONS]
+_WKHTMLTOPDF_CMD_PREFIX = ['wkhtmltopdf', *WKHTMLTOPDF_OPTIONS]
+_WKHTMLTOPDF_STDIN_CMD = [*_WKHTMLTOPDF_CMD_PREFIX, '-']
+
+_page_header = None
+_header_path = None
+
+def _get_page_header():
+    """
+    MERMAID_HEADER plus the github-markdown stylesheet.
+
+    The stylesheet is inlined from a local copy (shipped with the package, or
+    fetched once into the user cache dir), so conversions need no network
+    round-trip for it; if it can't be fetched the page links the CDN copy instead.
+    """
+    global _page_header
+    if _page_header is None:
+        try:
+            css_path = GITHUB_MARKDOWN_CSS_BUNDLED
+            if not os.path.exists(css_path):
+                css_path = GITHUB_MARKDOWN_CSS_PATH
+            if not os.path.exists(css_path):
+                with urllib.request.urlopen(GITHUB_MARKDOWN_CSS, timeout=10) as response:
+                    css_bytes = response.read()
+                # Write under a private name and rename, so an interrupted download
+                # never leaves a truncated stylesheet that would be reused from then on
+                os.makedirs(os.path.dirname(css_path), exist_ok=True)
+                fd, temp_path = tempfile.mkstemp(suffix='.css', dir=os.path.dirname(css_path))
+                try:
+                    with os.fdopen(fd, 'wb') as f:
+                        f.write(css_bytes)
+                    os.replace(temp_path, css_path)
+                finally:
+                    if os.path.exists(temp_path):
+                        os.unlink(temp_path)
+            css = Path(css_path).read_text(encoding='utf-8')
+            css_tag = f'<style>\n{css}\n</style>'
+        except Exception as e:
+            logger.warning(f"Could not get a local copy of {GITHUB_MARKDOWN_CSS}, linking it instead: {e}")
+            css_tag = f'<link rel="stylesheet" href="{GITHUB_MARKDOWN_CSS}">'
+        _page_header = f'{css_tag}\n{MERMAID_HEADER}'
+    return _page_header
+
+def _mermaid_header_path():
+    """Path of a temp file holding the page header, written once per process."""
+    global _header_path
+    if _header_path is None or not os.path.exists(_header_path):
+        fd, path = tempfile.mkstemp(suffix='.html')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(_get_page_header())
+        atexit.register(_remove_quietly, path)
+        _header_path = path
+    return _header_path
+
+def _remove_quietly(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+def markdown_to_html(markdown_content):
+    """
+    Convert markdown content to HTML with proper rendering of code blocks and Mermaid diagrams.
+    
+    Rendering happens in-process with Python-Markdown; set USE_PANDOC=1 to
+    render with pandoc instead (numbered sections, MathJax, embedded CSS).
+    
+    Args:
+        markdown_content (str): The markdown content to convert
+        
+    Returns:
+        str: The HTML content
+    """
+    if use_pandoc:
+        return _pandoc_markdown_to_html(markdown_content)
+    
+    try:
+        import markdown
+        from pymdownx.superfences import fence_div_format
+    except ImportError as e:
+        logger.warning(f"Python-Markdown unavailable ({e}), falling back to pandoc")
+        return _pandoc_markdown_to_html(markdown_content)
+    
+    try:
+        md = markdown.Markdown(
+            extensions=['toc', 'tables', 'pymdownx.superfences'],
+            extension_configs={
+                'toc': {'toc_depth': '1-3'},
+                # ```mermaid blocks become <div class="mermaid"> for the Mermaid runtime
+                'pymdownx.superfences': {
+                    'custom_fences': [{'name': 'mermaid', 'class': 'mermaid', 'format': fence_div_format}]
+                },
+            }
+        )
+        body = md.convert(markdown_content)
+        title = md.toc_tokens[0]['name'] if md.toc_tokens else 'Tutorial'
+        return (
+            '<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n'
+            f'<title>{title}</title>\n'
+            f'{_get_page_header()}\n</head>\n<body>\n'
+            f'<nav id="TOC">\n{md.toc}\n</nav>\n'
+            f'<article class="markdown-body">\n{body}\n</article>\n'
+            '</body>\n</html>\n'
+        )
+    
+    except Exception as e:
+        logger.error(f"Error in markdown_to_html: {str(e)}")
+        return None
+
+# Seconds a pandoc-server conversion may take; the server's own default (2 s) is far
+# too short for a combined tutorial, and the HTTP request waits just as long
+PANDOC_SERVER_TIMEOUT = 120
+
+# (process, url) of the shared pandoc-server, False once starting it has failed
+_pandoc_server = None
+_pandoc_server_lock = threading.Lock()
+
+def _get_pandoc_server_url():
+    """
+    URL of a pandoc-server kept running for the life of the process.
+
+    It is started on first use so later conversions skip pandoc's process
+    startup; returns None when no server binary is available.
+    """
+    global _pandoc_server
+    with _pandoc_server_lock:
+        if _pandoc_server is False:
+            return None
+        if _pandoc_server and _pandoc_server[0].poll() is None:
+            return _pandoc_server[1]
+        
+        # pandoc >= 3 ships the server both as pandoc-server and as `pandoc server`
+        for cmd in (['pandoc-server'], ['pandoc', 'server']):
+            with socket.socket() as sock:
+                sock.bind(('127.0.0.1', 0))
+                port = sock.getsockname()[1]
+            try:
+                process = subprocess.Popen([*cmd, '--port', str(port), '--timeout', str(PANDOC_SERVER_TIMEOUT)],
+                                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            except OSError:
+                continue
+            
+            # Wait (up to ~5 s) for the server to accept connections
+            for _ in range(50):
+                if process.poll() is not None:
+                    break
+                try:
+                    socket.create_connection(('127.0.0.1', port), timeout=0.1).close()
+                except OSError:
+                    time.sleep(0.1)
+                    continue
+                atexit.register(process.terminate)
+                _pandoc_server = (process, f'http://127.0.0.1:{port}')
+                return _pandoc_server[1]
+            process.kill()
+        
+        logger.info("pandoc-server unavailable, using the pandoc CLI")
+        _pandoc_server = False
+        return None
+
+def _pandoc_server_to_html(url, markdown_content):
+    """Convert markdown_content with a running pandoc-server."""
+    return _pandoc_server_request(url, {
+        **PANDOC_SERVER_OPTIONS,
+        'text': markdown_content,
+        'variables': {'header-includes': _get_page_header()},
+    })
+
+def _pandoc_server_request(url, payload):
+    """POST a conversion request (pandoc options plus 'text') and return the output text."""
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(payload).encode('utf-8'),
+        headers={'Content-Type': 'application/json', 'Accept': 'application/json'}
+    )
+    with urllib.request.urlopen(request, timeout=PANDOC_SERVER_TIMEOUT) as response:
+        result = json.loads(response.read())
+    if result.get('base64'):
+        return base64.b64decode(result['output']).decode('utf-8')
+    return result['output']
+
+def _pandoc_markdown_to_html(markdown_content):
+    """Render markdown_content to a standalone HTML page with pandoc."""
+    # Prefer the long-running server; fall back to one CLI process per call
+    url = _get_pandoc_server_url()
+    if url:
+        try:
+            return _pandoc_server_to_html(url, markdown_content)
+        except Exception as e:
+            logger.warning(f"pandoc-server conversion failed, using the pandoc CLI: {e}")
+    
+    try:
+        # Create a temporary file for the markdown content
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.md', delete=False) as temp_md:
+            temp_md.write(markdown_content)
+            temp_md_path = temp_md.name
+        
+        # Create a temporary file for the HTML output
+        with tempfile.NamedTemporaryFile(suffix='.html', delete=False) as temp_html:
+            temp_html_path = temp_html.name
+        
+        # Convert markdown to HTML using pandoc
+        cmd = [*_PANDOC_CMD_TEMPLATE]
+        cmd[1], cmd[3] = temp_md_path, temp_html_path
         
         # Run the command with the Mermaid script as input to --include-in-header
-        process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        _, stderr = process.communicate(input=mermaid_script)
+        # Raw bytes both ways; only stderr is decoded, and only on failure
+        process = subprocess.run(cmd, input=_get_page_header().encode('utf-8'), capture_output=True)
         
         if process.returncode != 0:
-            logger.error(f"Error converting markdown to HTML: {stderr}")
+            logger.error(f"Error converting markdown to HTML: {process.stderr.decode('utf-8', 'replace')}")
             return None
         
         # Read the HTML content
@@ -114,9 +344,28 @@ def markdown_to_html(markdown_content):
         return html_content
     
     except Exception as e:
-        logger.error(f"Error in markdown_to_html: {str(e)}")
+        logger.error(f"Error in _pandoc_markdown_to_html: {str(e)}")
         return None
 
+# Written after every chapter in the combined tutorial
+CHAPTER_SEPARATOR = "\n\n---\n\n"
+
+# Leading chapter number of a file name, e.g. "10" in "10_flow.md"
+_LEADING_NUMBER = re.compile(r'\d+')
+
+def _order_key(name):
+    """
+    Sort key for combining chapters: index.md first, then numbered files in
+    numeric order (so 10_x.md follows 9_x.md), then everything else in its
+    original order (sorted() is stable).
+    """
+    if name == 'index.md':
+        return (0, 0, '')
+    match = _LEADING_NUMBER.match(name)
+    if match:
+        return (1, int(match.group()), name)
+    return (2, 0, '')
+
 def create_combined_markdown(files_dict, output_path=None):
     """
     Combine multiple markdown files into a single markdown file.
@@ -129,23 +378,12 @@ def create_combined_markdown(files_dict, output_path=None):
         tuple: (combined_content, output_path)
     """
     try:
-        # Start with index.md if it exists
-        combined_content = ""
-        if 'index.md' in files_dict:
-            combined_content += files_dict['index.md'] + "\n\n---\n\n"
+        # Order the chapters in one sorted pass
+        ordered = sorted((f for f in files_dict if f.endswith('.md')), key=_order_key)
         
-        # Add all numbered files in order
-        numbered_files = sorted([f for f in files_dict.keys() 
-                                if f.startswith(('0', '1', '2', '3', '4', '5', '6', '7', '8', '9')) 
-                                and f.endswith('.md')])
-        
-        for file in numbered_files:
-            combined_content += files_dict[file] + "\n\n---\n\n"
-        
-        # Add any remaining files
-        for file in files_dict:
-            if file != 'index.md' and file not in numbered_files and file.endswith('.md'):
-                combined_content += files_dict[file] + "\n\n---\n\n"
+        # Every part is followed by a separator, as before; one join, no per-part copies
+        parts = [files_dict[file] for file in ordered]
+        combined_content = CHAPTER_SEPARATOR.join(parts) + CHAPTER_SEPARATOR if parts else ""
         
         # Save to file if output_path is provided
         if output_path:
@@ -183,30 +421,16 @@ def html_to_pdf(html_content, output_path=None):
             output_path = temp_pdf.name
         
         # Convert HTML to PDF using wkhtmltopdf
-        cmd = [
-            'wkhtmltopdf',
-            '--enable-local-file-access',
-            '--javascript-delay', '1000',  # Wait for JavaScript to execute (for Mermaid)
-            '--no-stop-slow-scripts',
-            '--margin-top', '20',
-            '--margin-right', '20',
-            '--margin-bottom', '20',
-            '--margin-left', '20',
-            '--page-size', 'A4',
-            '--encoding', 'UTF-8',
-            '--footer-center', '[page]/[topage]',
-            temp_html_path,
-            output_path
-        ]
+        cmd = [*_WKHTMLTOPDF_CMD_PREFIX, temp_html_path, output_path]
         
         # Run the command
-        process = subprocess.run(cmd, capture_output=True, text=True)
+        process = subprocess.run(cmd, capture_output=True)
         
         # Clean up temporary files
         os.unlink(temp_html_path)
         
         if process.returncode != 0:
-            logger.error(f"Error converting HTML to PDF: {process.stderr}")
+            logger.error(f"Error converting HTML to PDF: {process.stderr.decode('utf-8', 'replace')}")
             return None
         
         return output_path
@@ -226,13 +450,87 @@ def markdown_to_pdf(markdown_content, output_path=None):
     Returns:
         str: The path to the generated PDF
     """
-    # Convert markdown to HTML
-    html_content = markdown_to_html(markdown_content)
-    if not html_content:
-        return None
+    if not use_pandoc:
+        # In-process HTML, then wkhtmltopdf
+        html_content = markdown_to_html(markdown_content)
+        if not html_content:
+            return None
+        return html_to_pdf(html_content, output_path)
     
-    # Convert HTML to PDF
-    return html_to_pdf(html_content, output_path)
+    try:
+        # Create a temporary file for the PDF output if not provided
+        if output_path is None:
+            temp_pdf = tempfile.NamedTemporaryFile(suffix='.pdf', delete=False)
+            temp_pdf.close()
+            output_path = temp_pdf.name
+        
+        # Pipe pandoc's HTML straight into wkhtmltopdf; no intermediate HTML file.
+        # stdin carries the markdown here, so the Mermaid header goes through a file.
+        # pandoc's stderr goes to a file: nobody reads it until wkhtmltopdf is done,
+        # and a full stderr pipe would stall pandoc and, through it, wkhtmltopdf
+        pandoc_stderr_file = tempfile.TemporaryFile()
+        pandoc = subprocess.Popen(
+            [*_PANDOC_PIPE_CMD, '--include-in-header', _mermaid_header_path()],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=pandoc_stderr_file
+        )
+        wkhtmltopdf = subprocess.Popen(
+            [*_WKHTMLTOPDF_STDIN_CMD, output_path],
+            stdin=pandoc.stdout, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+        )
+        pandoc.stdout.close()  # wkhtmltopdf owns the read end now
+        
+        # Feed pandoc from a thread so neither process can stall on a full pipe
+        feeder = threading.Thread(target=_feed_stdin, args=(pandoc.stdin, markdown_content.encode('utf-8')))
+        feeder.start()
+        _, wk_stderr = wkhtmltopdf.communicate()
+        feeder.join()
+        pandoc.wait()
+        with pandoc_stderr_file:
+            pandoc_stderr_file.seek(0)
+            pandoc_stderr = pandoc_stderr_file.read()
+        
+        if pandoc.returncode != 0:
+            logger.error(f"Error converting markdown to HTML: {pandoc_stderr.decode('utf-8', 'replace')}")
+            return None
+        if wkhtmltopdf.returncode != 0:
+            logger.error(f"Error converting HTML to PDF: {wk_stderr.decode('utf-8', 'replace')}")
+            return None
+        
+        return output_path
+    
+    except Exception as e:
+        logger.error(f"Error in markdown_to_pdf: {str(e)}")
+        return None
+
+def _feed_stdin(stream, data):
+    """Write data to a subprocess stdin and close it, tolerating an early exit of the reader."""
+    try:
+        stream.write(data)
+    except BrokenPipeError:
+        pass
+    finally:
+        try:
+            stream.close()
+        except BrokenPipeError:
+            pass
+
+# Files at least this large are decoded straight from a memory mapping
+MMAP_THRESHOLD = 256 * 1024
+
+def _read_text_file(entry):
+    """Read one directory entry as UTF-8 text, logging and returning None on failure."""
+    try:
+        if entry.stat().st_size >= MMAP_THRESHOLD:
+            # Decode from the page cache without an intermediate bytes copy
+            with open(entry.path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                text = str(mm, 'utf-8')
+            # Match text-mode reads, which translate newlines
+            return text.replace('\r\n', '\n').replace('\r', '\n')
+        with open(entry.path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except Exception as e:
+        logger.error(f"Error reading file {entry.name}: {str(e)}")
+        return None
 
 def get_file_contents(directory, file_pattern=None):
     """
@@ -246,21 +544,17 @@ def get_file_contents(directory, file_pattern=None):
         dict: Dictionary mapping filenames to their content
     """
     try:
-        files_dict = {}
-        for file in os.listdir(directory):
-            if file_pattern and not file.endswith(file_pattern):
-                continue
-            
-            file_path = os.path.join(directory, file)
-            if os.path.isfile(file_path):
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        files_dict[file] = f.read()
-                except Exception as e:
-                    logger.error(f"Error reading file {file}: {str(e)}")
+        # is_file() comes from the directory read, no extra stat
+        with os.scandir(directory) as it:
+            entries = [entry for entry in it
+                       if entry.is_file() and (not file_pattern or entry.name.endswith(file_pattern))]
+        
+        # File reads release the GIL, so a small pool overlaps the I/O
+        with ThreadPoolExecutor(max_workers=min(8, len(entries)) or 1) as pool:
+            contents = list(pool.map(_read_text_file, entries))
         
-        return files_dict
+        return {entry.name: content for entry, content in zip(entries, contents) if content is not None}
     
     except Exception as e:
         logger.error(f"Error in get_file_contents: {str(e)}")
-        return {}
\ No newline at end of file
+        return {}
@@ -1,304 +1,949 @@
 import os
+import re
+import glob
+import mimetypes
+import urllib.parse
+import urllib.request
+import html as html_module
+import shutil
+import hashlib
+import functools
 import subprocess
 import tempfile
+import threading
+import time
+import atexit
 import logging
+import importlib
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from utils.markdown_converter import _get_pandoc_server_url, _pandoc_server_request
 
 logger = logging.getLogger(__name__)
 
-def markdown_to_pdf(markdown_content, output_path=None):
+# Optional modules, imported on first use and bound here; False marks one that isn't installed
+_lazy_modules = {}
+
+def _lazy_import(name):
+    """Import an optional module once and return it, or None if it isn't usable."""
+    module = _lazy_modules.get(name)
+    if module is None:
+        try:
+            module = importlib.import_module(name)
+        except ImportError:
+            module = False
+        except OSError as e:
+            # WeasyPrint raises OSError when its native libraries (pango, cairo) are missing
+            logger.warning(f"Optional module {name} is installed but failed to load: {e}")
+            module = False
+        _lazy_modules[name] = module
+    return module or None
+
+def _require(name):
+    """Like _lazy_import, but raise ImportError for a missing or unusable module."""
+    module = _lazy_import(name)
+    if module is None:
+        raise ImportError(f"No module named '{name}'")
+    return module
+
+def _probe_backends():
+    """PDF backends available in this environment, in order of preference."""
+    backends = []
+    if shutil.which('pandoc'):
+        backends.append('pandoc')
+    # The HTML-based fallbacks render markdown with cmarkgfm or Python-Markdown first;
+    # find_spec checks they are installed without paying for the import
+    if importlib.util.find_spec('cmarkgfm') or importlib.util.find_spec('markdown'):
+        # Headless Chromium (Playwright) lays pages out far faster than WeasyPrint
+        if importlib.util.find_spec('playwright'):
+            backends.append('chromium')
+        for module in ('weasyprint', 'pdfkit'):
+            if importlib.util.find_spec(module):
+                backends.append(module)
+    return backends
+
+# Probed once at import, so conversions go straight to a working backend
+_BACKENDS = _probe_backends()
+_BACKEND = _BACKENDS[0] if _BACKENDS else None
+if _BACKEND is None:
+    logger.warning("No PDF backend found (install pandoc, playwright, weasyprint or pdfkit)")
+
+def _detect_pdf_engine():
+    """Preferred PDF engine installed for pandoc: tectonic, then xelatex, then wkhtmltopdf."""
+    for engine in ('tectonic', 'xelatex', 'wkhtmltopdf'):
+        if shutil.which(engine):
+            return engine
+    return 'xelatex'
+
+# tectonic starts in a fraction of xelatex's time; both keep the LaTeX page layout and
+# the pandoc-server path, so wkhtmltopdf (which skips LaTeX) is only used without them
+_PDF_ENGINE = _detect_pdf_engine()
+_PDF_ENGINE_FOUND = shutil.which(_PDF_ENGINE) is not None
+_LATEX_ENGINES = ('tectonic', 'xelatex')
+
+# LaTeX-only template variables (ignored by the wkhtmltopdf engine, so not passed to it)
+_LATEX_VARIABLES = [
+    '-V', 'geometry:margin=1in',
+    '-V', 'colorlinks=true',
+    '-V', 'linkcolor=blue',
+    '-V', 'urlcolor=blue',
+    '-V', 'toccolor=blue',
+]
+
+# Stylesheet passed to pandoc for every document
+_PANDOC_CSS = """
+    body {
+        font-family: 'Arial', sans-serif;
+        line-height: 1.6;
+        max-width: 800px;
+        margin: 0 auto;
+        padding: 20px;
+    }
+    h1, h2, h3, h4, h5, h6 {
+        color: #333;
+        margin-top: 24px;
+        margin-bottom: 16px;
+    }
+    h1 {
+        font-size: 2em;
+        border-bottom: 1px solid #eaecef;
+        padding-bottom: 0.3em;
+    }
+    h2 {
+        font-size: 1.5em;
+        border-bottom: 1px solid #eaecef;
+        padding-bottom: 0.3em;
+    }
+    code {
+        font-family: 'Courier New', Courier, monospace;
+        background-color: #f6f8fa;
+        padding: 0.2em 0.4em;
+        border-radius: 3px;
+    }
+    pre {
+        background-color: #f6f8fa;
+        border-radius: 3px;
+        padding: 16px;
+        overflow: auto;
+    }
+    pre code {
+        background-color: transparent;
+        padding: 0;
+    }
+    blockquote {
+        border-left: 4px solid #dfe2e5;
+        padding: 0 1em;
+        color: #6a737d;
+    }
+    table {
+        border-collapse: collapse;
+        width: 100%;
+        margin-bottom: 16px;
+    }
+    table, th, td {
+        border: 1px solid #dfe2e5;
+    }
+    th, td {
+        padding: 6px 13px;
+    }
+    th {
+        background-color: #f6f8fa;
+    }
+    img {
+        max-width: 100%;
+    }
+    hr {
+        height: 0.25em;
+        padding: 0;
+        margin: 24px 0;
+        background-color: #e1e4e8;
+        border: 0;
+    }
+    """
+
+
+# Page styling for the HTML-based backends
+_WEASY_BASE_CSS = """
+    body {
+        font-family: Arial, sans-serif;
+        line-height: 1.6;
+        margin: 2cm;
+    }
+    h1, h2, h3, h4, h5, h6 {
+        color: #333;
+        margin-top: 24px;
+        margin-bottom: 16px;
+    }
+    h1 {
+        font-size: 2em;
+        border-bottom: 1px solid #eaecef;
+        padding-bottom: 0.3em;
+    }
+    h2 {
+        font-size: 1.5em;
+        border-bottom: 1px solid #eaecef;
+        padding-bottom: 0.3em;
+    }
+    code {
+        font-family: monospace;
+        background-color: #f6f8fa;
+        padding: 0.2em 0.4em;
+        border-radius: 3px;
+    }
+    pre {
+        background-color: #f6f8fa;
+        border-radius: 3px;
+        padding: 16px;
+        overflow: auto;
+    }
+    pre code {
+        background-color: transparent;
+        padding: 0;
+    }
+    blockquote {
+        border-left: 4px solid #dfe2e5;
+        padding: 0 1em;
+        color: #6a737d;
+    }
+    table {
+        border-collapse: collapse;
+        width: 100%;
+        margin-bottom: 16px;
+    }
+    table, th, td {
+        border: 1px solid #dfe2e5;
+    }
+    th, td {
+        padding: 6px 13px;
+    }
+    th {
+        background-color: #f6f8fa;
+    }
+    img {
+        max-width: 100%;
+    }
+    hr {
+        height: 0.25em;
+        padding: 0;
+        margin: 24px 0;
+        background-color: #e1e4e8;
+        border: 0;
+    }
+    """
+
+def _pygments_css():
+    """Highlighting rules for the .highlight blocks, generated by Pygments ('' without it)."""
+    try:
+        from pygments.formatters import HtmlFormatter
+    except ImportError:
+        return ''
+    return HtmlFormatter(style='friendly').get_style_defs('.highlight')
+
+# Stylesheet for the WeasyPrint and Chromium backends: page styling plus the code
+# highlighting rules, generated once instead of hand-maintained
+_HIGHLIGHT_CSS = _pygments_css()
+_WEASY_CSS = _WEASY_BASE_CSS + _HIGHLIGHT_CSS
+
+# Stylesheet inlined into the page rendered by the pdfkit backend
+_PDFKIT_CSS = """
+    body {
+        font-family: Arial, sans-serif;
+        line-height: 1.6;
+        margin: 2cm;
+    }
+    h1, h2, h3, h4, h5, h6 {
+        color: #333;
+    }
+    code {
+        font-family: monospace;
+        background-color: #f6f8fa;
+        padding: 0.2em 0.4em;
+        border-radius: 3px;
+    }
+    pre {
+        background-color: #f6f8fa;
+        border-radius: 3px;
+        padding: 16px;
+        overflow: auto;
+    }
+    """
+
+# pandoc-server can't run a PDF engine, so it is asked for the standalone LaTeX that
+# the CLI would hand to a LaTeX engine (the same options as _render_one's command line)
+_PANDOC_SERVER_OPTIONS = {
+    'from': 'markdown+yaml_metadata_block+raw_html+fenced_divs+mermaid',
+    'to': 'latex',
+    'standalone': True,
+    'highlight-style': 'tango',
+    'table-of-contents': True,
+    'toc-depth': 3,
+    'number-sections': True,
+    'variables': {
+        'geometry': 'margin=1in',
+        'colorlinks': True,
+        'linkcolor': 'blue',
+        'urlcolor': 'blue',
+        'toccolor': 'blue',
+    },
+}
+
+# Per-user directory for the files that are shared between conversions; unlike the
+# system temp dir, no other user can place files in it for us to pick up
+_USER_CACHE_DIR = os.path.join(os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "tutorial-pdf")
+
+# _PANDOC_CSS lives in the user cache dir under a name derived from its content,
+# so it is written once and then shared by every conversion (and process)
+_CSS_PATH = os.path.join(
+    _USER_CACHE_DIR,
+    f"pandoc_{hashlib.blake2b(_PANDOC_CSS.encode('utf-8'), digest_size=8).hexdigest()}.css"
+)
+
+# Private copy of the stylesheet for this process, when the user cache dir isn't writable
+_css_fallback_path = None
+
+def _remove_quietly(path):
+    """Delete path if it still exists."""
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+def _write_all(fd, data):
+    """Write bytes straight to a raw descriptor, skipping the text and buffer layers."""
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+def _pandoc_css_path():
+    """Path of the pandoc stylesheet, written on first use."""
+    global _css_fallback_path
+    if _css_fallback_path:
+        return _css_fallback_path
+    if os.path.exists(_CSS_PATH):
+        return _CSS_PATH
+    
+    try:
+        os.makedirs(_USER_CACHE_DIR, exist_ok=True)
+        # Write to a private name and rename, so a concurrent reader never sees a partial file
+        fd, temp_path = tempfile.mkstemp(suffix='.css', dir=_USER_CACHE_DIR)
+    except OSError as e:
+        # mkstemp's unpredictable, owner-only file in the temp dir is just as safe, if not shared
+        logger.warning(f"Cannot write to {_USER_CACHE_DIR}, using a temporary stylesheet: {e}")
+        fd, _css_fallback_path = tempfile.mkstemp(suffix='.css')
+        try:
+            _write_all(fd, _PANDOC_CSS.encode('utf-8'))
+        finally:
+            os.close(fd)
+        atexit.register(_remove_quietly, _css_fallback_path)
+        return _css_fallback_path
+    
+    try:
+        try:
+            _write_all(fd, _PANDOC_CSS.encode('utf-8'))
+        finally:
+            os.close(fd)
+        os.replace(temp_path, _CSS_PATH)
+    finally:
+        _remove_quietly(temp_path)
+    return _CSS_PATH
+
+# wkhtmltopdf options for the pdfkit backend
+_PDFKIT_OPTIONS = {
+    'page-size': 'A4',
+    'margin-top': '2cm',
+    'margin-right': '2cm',
+    'margin-bottom': '2cm',
+    'margin-left': '2cm',
+    'encoding': 'UTF-8',
+    'no-outline': None,
+    'enable-local-file-access': None
+}
+
+# Generated PDFs, keyed by content plus everything that shapes the output.
+# Off unless PDF_CACHE_DIR is set; the least recently used PDFs are evicted once
+# the directory grows past PDF_CACHE_MAX_MB
+_PDF_CACHE_DIR = os.path.expanduser(os.getenv("PDF_CACHE_DIR", ""))
+_PDF_CACHE_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_MB", "500")) * 1024 * 1024
+_PDF_CACHE_SALT = repr((
+    _BACKENDS, _PDF_ENGINE, _PANDOC_CSS, _PANDOC_SERVER_OPTIONS, _WEASY_CSS, _PDFKIT_CSS, _PDFKIT_OPTIONS
+)).encode('utf-8')
+
+# weasyprint.CSS built from _WEASY_CSS on first use; parsing it once saves re-tokenizing per document
+_weasy_css = None
+
+def _get_weasy_css():
+    """The parsed WeasyPrint stylesheet, built on first use."""
+    global _weasy_css
+    if _weasy_css is None:
+        _weasy_css = _require('weasyprint').CSS(string=_WEASY_CSS)
+    return _weasy_css
+
+def _run_quiet(cmd, input_bytes=None):
     """
-    Convert markdown content to PDF using pandoc.
+    Run a converter with stdout discarded and stderr kept out of memory.
+    
+    Args:
+        cmd (list): The command to run
+        input_bytes (bytes, optional): Data for the command's stdin
+        
+    Returns:
+        str: None on success, otherwise the command's stderr
+    """
+    # stderr goes to an anonymous file (the child needs a real descriptor) and is only
+    # read back and decoded on failure
+    with tempfile.TemporaryFile() as stderr_buf:
+        result = subprocess.run(cmd, input=input_bytes, stdout=subprocess.DEVNULL, stderr=stderr_buf)
+        if result.returncode == 0:
+            return None
+        stderr_buf.seek(0)
+        return stderr_buf.read().decode('utf-8', 'replace')
+
+def _render_one(markdown_content, pdf_path, css_path=None):
+    """
+    Run pandoc on a single markdown document, fed through stdin.
     
     Args:
         markdown_content (str): The markdown content to convert
-        output_path (str, optional): The path to save the PDF. If None, a temporary file will be created.
+        pdf_path (str): Where to write the PDF
+        css_path (str, optional): A stylesheet to apply; when given, images and
+            other resources are embedded as well (--embed-resources)
         
     Returns:
-        str: The path to the generated PDF file
+        bool: True if pandoc succeeded
     """
-    try:
-        # Create a temporary file for the markdown content
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.md', delete=False) as temp_md:
-            temp_md.write(markdown_content)
-            temp_md_path = temp_md.name
+    cmd = [
+        'pandoc',
+        '-',
+        '-o', pdf_path,
+        f'--pdf-engine={_PDF_ENGINE}',
+        '--highlight-style=tango',
+        '--standalone',
+        '--toc',  # Table of contents
+        '--toc-depth=3',
+        '--number-sections',
+        '-f', 'markdown+yaml_metadata_block+raw_html+fenced_divs+mermaid',
+    ]
+    # Page geometry and link colours are LaTeX template variables
+    if _PDF_ENGINE in _LATEX_ENGINES:
+        cmd += _LATEX_VARIABLES
+    # Embedding base64-encodes (and fetches) every referenced resource, so it is opt-in;
+    # wkhtmltopdf styles the page from the stylesheet, which it reads as a local file
+    if css_path:
+        cmd += ['--css', css_path, '--embed-resources']
+    elif _PDF_ENGINE == 'wkhtmltopdf':
+        cmd += ['--css', _pandoc_css_path()]
+    
+    # Run the command
+    error = _run_quiet(cmd, markdown_content.encode('utf-8'))
+    if error is not None:
+        logger.error(f"Error converting markdown to PDF: {error}")
+        return False
+    return True
+
+def _latex_to_pdf(latex, output_path):
+    """
+    Typeset a standalone LaTeX document with _PDF_ENGINE (tectonic or xelatex).
+    
+    Args:
+        latex (str): The LaTeX source
+        output_path (str): Where to write the PDF
         
-        # Create a temporary file for the PDF output if not provided
-        if output_path is None:
-            temp_pdf = tempfile.NamedTemporaryFile(suffix='.pdf', delete=False)
-            temp_pdf.close()
-            output_path = temp_pdf.name
+    Returns:
+        bool: True if the engine succeeded
+    """
+    # Work next to the output so the finished PDF is renamed into place, not copied across filesystems
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(output_path))) as temp_dir:
+        tex_path = os.path.join(temp_dir, 'document.tex')
+        fd = os.open(tex_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        try:
+            _write_all(fd, latex.encode('utf-8'))
+        finally:
+            os.close(fd)
         
-        # Create a CSS file for styling
-        css_content = """
-        body {
-            font-family: 'Arial', sans-serif;
-            line-height: 1.6;
-            max-width: 800px;
-            margin: 0 auto;
-            padding: 20px;
-        }
-        h1, h2, h3, h4, h5, h6 {
-            color: #333;
-            margin-top: 24px;
-            margin-bottom: 16px;
-        }
-        h1 {
-            font-size: 2em;
-            border-bottom: 1px solid #eaecef;
-            padding-bottom: 0.3em;
-        }
-        h2 {
-            font-size: 1.5em;
-            border-bottom: 1px solid #eaecef;
-            padding-bottom: 0.3em;
-        }
-        code {
-            font-family: 'Courier New', Courier, monospace;
-            background-color: #f6f8fa;
-            padding: 0.2em 0.4em;
-            border-radius: 3px;
-        }
-        pre {
-            background-color: #f6f8fa;
-            border-radius: 3px;
-            padding: 16px;
-            overflow: auto;
-        }
-        pre code {
-            background-color: transparent;
-            padding: 0;
-        }
-        blockquote {
-            border-left: 4px solid #dfe2e5;
-            padding: 0 1em;
-            color: #6a737d;
-        }
-        table {
-            border-collapse: collapse;
-            width: 100%;
-            margin-bottom: 16px;
-        }
-        table, th, td {
-            border: 1px solid #dfe2e5;
-        }
-        th, td {
-            padding: 6px 13px;
-        }
-        th {
-            background-color: #f6f8fa;
-        }
-        img {
-            max-width: 100%;
-        }
-        hr {
-            height: 0.25em;
-            padding: 0;
-            margin: 24px 0;
-            background-color: #e1e4e8;
-            border: 0;
-        }
-        """
+        # Run from the current directory so relative image paths resolve as they do for pandoc.
+        # tectonic reruns itself as needed; xelatex needs a second pass for the table of contents
+        if _PDF_ENGINE == 'tectonic':
+            cmd, passes = ['tectonic', '--outdir', temp_dir, tex_path], 1
+        else:
+            cmd, passes = ['xelatex', '-interaction=nonstopmode', '-halt-on-error', '-output-directory', temp_dir, tex_path], 2
+        for _ in range(passes):
+            error = _run_quiet(cmd)
+            if error is not None:
+                # xelatex reports errors in its log rather than on stderr
+                log_path = os.path.join(temp_dir, 'document.log')
+                if os.path.exists(log_path):
+                    with open(log_path, 'rb') as f:
+                        error += f.read()[-2000:].decode('utf-8', 'replace')
+                logger.error(f"Error converting markdown to PDF: {error}")
+                return False
         
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.css', delete=False) as temp_css:
-            temp_css.write(css_content)
-            temp_css_path = temp_css.name
+        os.replace(os.path.join(temp_dir, 'document.pdf'), output_path)
+        return True
+
+# Markdown images with an http(s) URL (an optional title after the URL is left alone)
+_REMOTE_IMAGE = re.compile(r'(!\[[^\]]*\]\()(https?://[^)\s]+)')
+
+# Downloaded images, named by URL hash and kept for later conversions. They live
+# in the per-user cache directory: a shared /tmp directory could be pre-filled by
+# another user with whatever they want rendered into our PDFs
+_IMAGE_CACHE_DIR = os.path.join(_PDF_CACHE_DIR or _USER_CACHE_DIR, 'images')
+
+# Largest image that is downloaded; anything bigger keeps its URL
+_MAX_IMAGE_BYTES = 10 * 1024 * 1024
+
+# URLs whose download failed, with the time of the failure; they are not retried
+# for _IMAGE_RETRY_AFTER seconds so each conversion doesn't wait on them again
+_failed_images = {}
+_IMAGE_RETRY_AFTER = 600
+
+def _fetch_image(url):
+    """
+    Download an image into the image cache, once per URL.
+    
+    Args:
+        url (str): The image URL
         
-        # Convert markdown to PDF using pandoc
-        cmd = [
-            'pandoc',
-            temp_md_path,
-            '-o', output_path,
-            '--pdf-engine=xelatex',
-            '-V', 'geometry:margin=1in',
-            '--highlight-style=tango',
-            '--standalone',
-            '--css', temp_css_path,
-            '--toc',  # Table of contents
-            '--toc-depth=3',
-            '--number-sections',
-            '-V', 'colorlinks=true',
-            '-V', 'linkcolor=blue',
-            '-V', 'urlcolor=blue',
-            '-V', 'toccolor=blue',
-            '-f', 'markdown+yaml_metadata_block+raw_html+fenced_divs+mermaid',
-            '--embed-resources',
-            '--standalone'
-        ]
+    Returns:
+        str: The local path, or None if the download failed or isn't an image
+    """
+    name = hashlib.sha1(url.encode('utf-8')).hexdigest()
+    cached = glob.glob(os.path.join(_IMAGE_CACHE_DIR, f"{name}.*"))
+    if cached:
+        return cached[0]
+    failed_at = _failed_images.get(url)
+    if failed_at is not None and time.monotonic() - failed_at < _IMAGE_RETRY_AFTER:
+        return None
+    
+    try:
+        with urllib.request.urlopen(url, timeout=20) as response:
+            content_type = response.headers.get_content_type()
+            if not content_type.startswith('image/'):
+                raise ValueError(f"not an image ({content_type})")
+            data = response.read(_MAX_IMAGE_BYTES + 1)
+            if len(data) > _MAX_IMAGE_BYTES:
+                raise ValueError(f"larger than {_MAX_IMAGE_BYTES} bytes")
+        # LaTeX picks the graphics driver by extension, so make sure there is one
+        ext = os.path.splitext(urllib.parse.urlparse(url).path)[1].lower()
+        if not re.fullmatch(r'\.[a-z0-9]{1,5}', ext):
+            ext = mimetypes.guess_extension(content_type) or '.img'
         
-        # Run the command
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        os.makedirs(_IMAGE_CACHE_DIR, exist_ok=True)
+        path = os.path.join(_IMAGE_CACHE_DIR, f"{name}{ext}")
+        fd, temp_path = tempfile.mkstemp(dir=_IMAGE_CACHE_DIR)
+        try:
+            try:
+                _write_all(fd, data)
+            finally:
+                os.close(fd)
+            os.replace(temp_path, path)
+        finally:
+            _remove_quietly(temp_path)
+        return path
+    
+    except Exception as e:
+        logger.warning(f"Failed to download image {url}: {e}")
+        _failed_images[url] = time.monotonic()
+        return None
+
+def _localize_remote_images(markdown_content):
+    """Download the remote images markdown_content references and point it at the local copies."""
+    urls = list(dict.fromkeys(match.group(2) for match in _REMOTE_IMAGE.finditer(markdown_content)))
+    if not urls:
+        return markdown_content
+    
+    # Downloads are network-bound, so they all go out at once
+    with ThreadPoolExecutor(max_workers=min(16, len(urls))) as pool:
+        local_paths = dict(zip(urls, pool.map(_fetch_image, urls)))
+    
+    # Images that couldn't be fetched keep their URL. Local paths go in <...>, so spaces
+    # or parentheses in the cache dir don't end the link early
+    def replace(match):
+        path = local_paths.get(match.group(2))
+        if not path or any(c in path for c in '<>\n'):
+            return match.group(0)
+        return f"{match.group(1)}<{path}>"
+    
+    return _REMOTE_IMAGE.sub(replace, markdown_content)
+
+def _markdown_to_pdf_pandoc(markdown_content, output_path, css_path):
+    """
+    Convert markdown to PDF with pandoc; None if pandoc fails.
+    """
+    # Remote images become local files first, so neither pandoc nor the LaTeX engine
+    # blocks on the network (xelatex can't load URLs at all)
+    markdown_content = _localize_remote_images(markdown_content)
+    
+    # Prefer the long-running pandoc-server for the markdown -> LaTeX step,
+    # which skips pandoc's startup on every document
+    url = _get_pandoc_server_url() if _PDF_ENGINE in _LATEX_ENGINES and _PDF_ENGINE_FOUND else None
+    if url:
+        try:
+            latex = _pandoc_server_request(url, {**_PANDOC_SERVER_OPTIONS, 'text': markdown_content})
+        except Exception as e:
+            logger.warning(f"pandoc-server conversion failed, using the pandoc CLI: {e}")
+        else:
+            try:
+                return output_path if _latex_to_pdf(latex, output_path) else None
+            except Exception as e:
+                logger.error(f"Error in _markdown_to_pdf_pandoc: {str(e)}")
+                return None
+    
+    try:
+        # The markdown goes straight to pandoc's stdin, no temporary file
+        return output_path if _render_one(markdown_content, output_path, css_path) else None
+    
+    except Exception as e:
+        logger.error(f"Error in _markdown_to_pdf_pandoc: {str(e)}")
+        return None
+
+def _pdf_cache_path(markdown_content, embed_resources):
+    """Cache file for markdown_content under the current settings, or None when caching is off."""
+    if not _PDF_CACHE_DIR:
+        return None
+    digest = hashlib.blake2b(_PDF_CACHE_SALT + (b'|embed' if embed_resources else b''), digest_size=16)
+    digest.update(markdown_content.encode('utf-8'))
+    return os.path.join(_PDF_CACHE_DIR, f"{digest.hexdigest()}.pdf")
+
+def _store_cached_pdf(pdf_path, cache_path):
+    """Copy a freshly generated PDF into the cache."""
+    try:
+        os.makedirs(_PDF_CACHE_DIR, exist_ok=True)
+        # Copy under a private name and rename, so readers never see a partial PDF.
+        # A copy rather than a hard link: rewriting the output must not alter the cache
+        fd, temp_path = tempfile.mkstemp(suffix='.pdf', dir=_PDF_CACHE_DIR)
+        os.close(fd)
+        try:
+            shutil.copyfile(pdf_path, temp_path)
+            os.replace(temp_path, cache_path)
+        finally:
+            _remove_quietly(temp_path)
+        _prune_pdf_cache()
+    except OSError as e:
+        logger.warning(f"Failed to cache PDF: {e}")
+
+def _prune_pdf_cache():
+    """Remove the least recently used PDFs until the cache fits in _PDF_CACHE_MAX_BYTES."""
+    entries = []
+    with os.scandir(_PDF_CACHE_DIR) as it:
+        for entry in it:
+            if entry.name.endswith('.pdf') and entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+    
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= _PDF_CACHE_MAX_BYTES:
+            break
+        _remove_quietly(path)
+        total -= size
+
+def _convert_one(markdown_content, output_path, css_path):
+    """Convert one document with the first backend that succeeds."""
+    # Create a temporary file for the PDF output if not provided (it is the result, so
+    # it outlives this call, but is removed again if no backend produces a PDF)
+    temp_output = output_path is None
+    if temp_output:
+        fd, output_path = tempfile.mkstemp(suffix='.pdf')
+        os.close(fd)
+    
+    # Re-rendering identical content is a file copy
+    cache_path = _pdf_cache_path(markdown_content, css_path is not None)
+    if cache_path and os.path.exists(cache_path):
+        try:
+            shutil.copyfile(cache_path, output_path)
+            os.utime(cache_path)  # Mark it recently used for eviction
+            return output_path
+        except OSError as e:
+            logger.warning(f"Failed to read cached PDF {cache_path}: {e}")
+    
+    # Only backends found at import are tried, in order of preference;
+    # each one returns None on failure rather than raising
+    for convert in _BACKEND_FUNCS:
+        result = convert(markdown_content, output_path, css_path)
+        if result:
+            if cache_path:
+                _store_cached_pdf(result, cache_path)
+            return result
+    
+    logger.error("No PDF backend could convert the document")
+    if temp_output:
+        _remove_quietly(output_path)
+    return None
+
+def _preload_weasyprint():
+    """Process pool initializer: import WeasyPrint and parse its stylesheet once per worker."""
+    try:
+        _get_weasy_css()
+    except Exception as e:
+        logger.warning(f"Failed to preload WeasyPrint: {e}")
+
+def _new_process_pool(max_workers):
+    """A process pool whose workers are warmed up for the in-process backends."""
+    initializer = _preload_weasyprint if 'weasyprint' in _BACKENDS else None
+    return ProcessPoolExecutor(max_workers=max_workers, initializer=initializer)
+
+# Upper bound on worker processes; each one holds its own copy of WeasyPrint
+_MAX_PROCESS_WORKERS = min(os.cpu_count() or 1, 8)
+
+# Worker processes kept for large batches, started on the first one and shut down at exit
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+def _get_process_pool():
+    """The shared process pool of _MAX_PROCESS_WORKERS workers."""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = _new_process_pool(_MAX_PROCESS_WORKERS)
+        return _process_pool
+
+def _discard_process_pool(pool):
+    """Shut down pool and, if it is the shared one, let the next batch start a fresh pool."""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is pool:
+            _process_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+@atexit.register
+def _shutdown_process_pool():
+    """Stop the shared pool's workers at interpreter exit."""
+    if _process_pool is not None:
+        _process_pool.shutdown()
+
+def _map_in_processes(pool, contents, output_paths, css_paths):
+    """
+    Run _convert_one over the documents in pool.
+    
+    A worker that dies (a crash in a native library, the OOM killer) breaks the
+    whole pool; the documents it takes down come back as None and the pool is
+    discarded, so later batches don't inherit it.
+    """
+    futures = [pool.submit(_convert_one, *args) for args in zip(contents, output_paths, css_paths)]
+    results = []
+    broken = False
+    for future in futures:
+        try:
+            results.append(future.result())
+        except BrokenProcessPool as e:
+            if not broken:
+                logger.error(f"PDF worker process died: {e}")
+                broken = True
+            results.append(None)
+    if broken:
+        _discard_process_pool(pool)
+    return results
+
+def markdown_to_pdf_batch(items, max_workers=None, embed_resources=False):
+    """
+    Convert several markdown documents to PDF in one go.
+    
+    Conversions run in parallel: on threads when pandoc or Chromium does the
+    work out of process, on a long-lived process pool (with WeasyPrint preloaded
+    in each worker) when an in-process backend would otherwise serialize on the GIL.
+    
+    Args:
+        items (list): (markdown_content, output_path) pairs; output_path may be
+            None to write to a temporary file
+        max_workers (int, optional): Parallel conversions; defaults to one per CPU
+            (at most 8 processes for the in-process backends)
+        embed_resources (bool): Have pandoc embed images and the stylesheet
+            (--embed-resources --css); off by default since it is slow
         
-        # Clean up temporary files
-        os.unlink(temp_md_path)
-        os.unlink(temp_css_path)
+    Returns:
+        list: The path of each generated PDF (None where conversion failed), in input order
+    """
+    items = list(items)
+    if not items:
+        return []
+    if _BACKEND is None:
+        logger.error("No PDF backend could convert the document")
+        return [None] * len(items)
+    
+    # The stylesheet file is shared by every document (only pandoc reads it, when embedding)
+    css_path = _pandoc_css_path() if embed_resources and 'pandoc' in _BACKENDS else None
+    contents = [content for content, _ in items]
+    output_paths = [output_path for _, output_path in items]
+    
+    if len(items) == 1:
+        return [_convert_one(contents[0], output_paths[0], css_path)]
+    
+    css_paths = [css_path] * len(items)
+    if _BACKEND in ('pandoc', 'chromium'):
+        with ThreadPoolExecutor(max_workers=max_workers or min(os.cpu_count() or 1, len(items))) as pool:
+            return list(pool.map(_convert_one, contents, output_paths, css_paths))
+    
+    # In-process backends go to worker processes that already have WeasyPrint loaded.
+    # Batches that can fill the shared pool reuse it; smaller ones (or an explicit
+    # max_workers) get a pool sized to the batch, which is shut down afterwards
+    workers = min(max_workers or _MAX_PROCESS_WORKERS, len(items), _MAX_PROCESS_WORKERS)
+    if max_workers is None and workers == _MAX_PROCESS_WORKERS:
+        return _map_in_processes(_get_process_pool(), contents, output_paths, css_paths)
+    with _new_process_pool(workers) as pool:
+        return _map_in_processes(pool, contents, output_paths, css_paths)
+
+def markdown_to_pdf(markdown_content, output_path=None, embed_resources=False):
+    """
+    Convert markdown content to PDF using pandoc, or Chromium/WeasyPrint/pdfkit when pandoc is unavailable or fails.
+    
+    Args:
+        markdown_content (str): The markdown content to convert
+        output_path (str, optional): The path to save the PDF. If None, a temporary file will be created.
+        embed_resources (bool): Have pandoc embed images and the stylesheet (slower)
         
-        if result.returncode != 0:
-            logger.error(f"Error converting markdown to PDF: {result.stderr}")
-            # Try alternative method with weasyprint
-            return _markdown_to_pdf_weasyprint(markdown_content, output_path)
+    Returns:
+        str: The path to the generated PDF file
+    """
+    return markdown_to_pdf_batch([(markdown_content, output_path)], embed_resources=embed_resources)[0]
+
+# Python-Markdown extensions for the HTML-based backends, built on first use
+_markdown_extensions = None
+
+def _get_markdown_extensions():
+    """The extension list shared by every Python-Markdown render."""
+    global _markdown_extensions
+    if _markdown_extensions is None:
+        from pymdownx.superfences import SuperFencesCodeExtension, fence_div_format
+        from pymdownx.highlight import HighlightExtension
         
-        return output_path
+        _markdown_extensions = [
+            'extra',
+            'toc',
+            'tables',
+            'fenced_code',
+            'codehilite',
+            HighlightExtension(css_class='highlight'),
+            SuperFencesCodeExtension(custom_fences=[
+                {'name': 'mermaid', 'class': 'mermaid', 'format': fence_div_format}
+            ])
+        ]
+    return _markdown_extensions
+
+# Fenced code as emitted by cmarkgfm: <pre lang="x"> (GitHub style) or <code class="language-x">
+_CMARK_CODE_BLOCK = re.compile(
+    r'<pre(?: lang="([^"]+)")?><code(?: class="language-([^"]+)")?>(.*?)</code></pre>', re.S
+)
+
+def _highlight_code_blocks(html):
+    """Highlight cmarkgfm's fenced code blocks with Pygments and turn Mermaid fences into divs."""
+    pygments = _lazy_import('pygments')
+    if pygments is None:
+        return html
+    formatters, lexers, util = (_lazy_import(f'pygments.{name}') for name in ('formatters', 'lexers', 'util'))
     
-    except Exception as e:
-        logger.error(f"Error in markdown_to_pdf: {str(e)}")
-        # Try alternative method with weasyprint
-        return _markdown_to_pdf_weasyprint(markdown_content, output_path)
+    formatter = formatters.HtmlFormatter(cssclass='highlight')
+    
+    def replace(match):
+        language = match.group(1) or match.group(2)
+        if not language:
+            return match.group(0)
+        if language == 'mermaid':
+            return f'<div class="mermaid">{match.group(3)}</div>'
+        try:
+            lexer = lexers.get_lexer_by_name(language)
+        except util.ClassNotFound:
+            return match.group(0)
+        # One Pygments call per block, on the unescaped source
+        return pygments.highlight(html_module.unescape(match.group(3)), lexer, formatter)
+    
+    return _CMARK_CODE_BLOCK.sub(replace, html)
 
-def _markdown_to_pdf_weasyprint(markdown_content, output_path):
+@functools.lru_cache(maxsize=32)
+def _render_html(markdown_content):
     """
-    Alternative method to convert markdown to PDF using WeasyPrint.
+    Convert markdown to an HTML fragment for the WeasyPrint and pdfkit backends.
+    
+    Uses the cmarkgfm C parser when it is installed and Python-Markdown
+    otherwise. Cached, so falling back from one HTML backend to the next
+    doesn't parse the markdown again.
+    
+    Args:
+        markdown_content (str): The markdown content to convert
+        
+    Returns:
+        str: The HTML fragment, or None if rendering failed
     """
     try:
-        import markdown
-        from weasyprint import HTML, CSS
-        from pymdownx.superfences import SuperFencesExtension
-        from pymdownx.highlight import HighlightExtension
+        cmarkgfm = _lazy_import('cmarkgfm')
+        if cmarkgfm is None:
+            return _require('markdown').markdown(markdown_content, extensions=_get_markdown_extensions())
         
-        # Convert markdown to HTML
-        html = markdown.markdown(
-            markdown_content,
-            extensions=[
-                'extra',
-                'toc',
-                'tables',
-                'fenced_code',
-                'codehilite',
-                HighlightExtension(css_class='highlight'),
-                SuperFencesExtension(custom_fences=[
-                    {'name': 'mermaid', 'class': 'mermaid', 'format': lambda x, y, z: f'<div class="mermaid">{x}</div>'}
-                ])
-            ]
-        )
+        # Raw HTML is kept, as Python-Markdown does
+        options = _lazy_import('cmarkgfm.cmark').Options.CMARK_OPT_UNSAFE
+        html = cmarkgfm.github_flavored_markdown_to_html(markdown_content, options=options)
+        return _highlight_code_blocks(html)
+    
+    except Exception as e:
+        logger.error(f"Error in _render_html: {str(e)}")
+        return None
+
+# Playwright's sync API is bound to the thread that started it, so a single worker
+# thread owns the browser and every Chromium conversion is run there
+_chromium_executor = None
+_chromium_lock = threading.Lock()
+# (playwright, browser, page), started on first use and reused for every document
+_chromium = None
+
+def _chromium_print(complete_html, output_path):
+    """Print a page with the shared browser (runs on the Chromium worker thread)."""
+    global _chromium
+    if _chromium is None:
+        from playwright.sync_api import sync_playwright
         
-        # Add CSS for styling
-        css_content = """
-        body {
-            font-family: Arial, sans-serif;
-            line-height: 1.6;
-            margin: 2cm;
-        }
-        h1, h2, h3, h4, h5, h6 {
-            color: #333;
-            margin-top: 24px;
-            margin-bottom: 16px;
-        }
-        h1 {
-            font-size: 2em;
-            border-bottom: 1px solid #eaecef;
-            padding-bottom: 0.3em;
-        }
-        h2 {
-            font-size: 1.5em;
-            border-bottom: 1px solid #eaecef;
-            padding-bottom: 0.3em;
-        }
-        code {
-            font-family: monospace;
-            background-color: #f6f8fa;
-            padding: 0.2em 0.4em;
-            border-radius: 3px;
-        }
-        pre {
-            background-color: #f6f8fa;
-            border-radius: 3px;
-            padding: 16px;
-            overflow: auto;
-        }
-        pre code {
-            background-color: transparent;
-            padding: 0;
-        }
-        blockquote {
-            border-left: 4px solid #dfe2e5;
-            padding: 0 1em;
-            color: #6a737d;
-        }
-        table {
-            border-collapse: collapse;
-            width: 100%;
-            margin-bottom: 16px;
-        }
-        table, th, td {
-            border: 1px solid #dfe2e5;
-        }
-        th, td {
-            padding: 6px 13px;
-        }
-        th {
-            background-color: #f6f8fa;
-        }
-        img {
-            max-width: 100%;
-        }
-        hr {
-            height: 0.25em;
-            padding: 0;
-            margin: 24px 0;
-            background-color: #e1e4e8;
-            border: 0;
-        }
-        .highlight .hll { background-color: #ffffcc }
-        .highlight .c { color: #999988; font-style: italic } /* Comment */
-        .highlight .err { color: #a61717; background-color: #e3d2d2 } /* Error */
-        .highlight .k { color: #000000; font-weight: bold } /* Keyword */
-        .highlight .o { color: #000000; font-weight: bold } /* Operator */
-        .highlight .cm { color: #999988; font-style: italic } /* Comment.Multiline */
-        .highlight .cp { color: #999999; font-weight: bold; font-style: italic } /* Comment.Preproc */
-        .highlight .c1 { color: #999988; font-style: italic } /* Comment.Single */
-        .highlight .cs { color: #999999; font-weight: bold; font-style: italic } /* Comment.Special */
-        .highlight .gd { color: #000000; background-color: #ffdddd } /* Generic.Deleted */
-        .highlight .ge { color: #000000; font-style: italic } /* Generic.Emph */
-        .highlight .gr { color: #aa0000 } /* Generic.Error */
-        .highlight .gh { color: #999999 } /* Generic.Heading */
-        .highlight .gi { color: #000000; background-color: #ddffdd } /* Generic.Inserted */
-        .highlight .go { color: #888888 } /* Generic.Output */
-        .highlight .gp { color: #555555 } /* Generic.Prompt */
-        .highlight .gs { font-weight: bold } /* Generic.Strong */
-        .highlight .gu { color: #aaaaaa } /* Generic.Subheading */
-        .highlight .gt { color: #aa0000 } /* Generic.Traceback */
-        .highlight .kc { color: #000000; font-weight: bold } /* Keyword.Constant */
-        .highlight .kd { color: #000000; font-weight: bold } /* Keyword.Declaration */
-        .highlight .kn { color: #000000; font-weight: bold } /* Keyword.Namespace */
-        .highlight .kp { color: #000000; font-weight: bold } /* Keyword.Pseudo */
-        .highlight .kr { color: #000000; font-weight: bold } /* Keyword.Reserved */
-        .highlight .kt { color: #445588; font-weight: bold } /* Keyword.Type */
-        .highlight .m { color: #009999 } /* Literal.Number */
-        .highlight .s { color: #d01040 } /* Literal.String */
-        .highlight .na { color: #008080 } /* Name.Attribute */
-        .highlight .nb { color: #0086B3 } /* Name.Builtin */
-        .highlight .nc { color: #445588; font-weight: bold } /* Name.Class */
-        .highlight .no { color: #008080 } /* Name.Constant */
-        .highlight .nd { color: #3c5d5d; font-weight: bold } /* Name.Decorator */
-        .highlight .ni { color: #800080 } /* Name.Entity */
-        .highlight .ne { color: #990000; font-weight: bold } /* Name.Exception */
-        .highlight .nf { color: #990000; font-weight: bold } /* Name.Function */
-        .highlight .nl { color: #990000; font-weight: bold } /* Name.Label */
-        .highlight .nn { color: #555555 } /* Name.Namespace */
-        .highlight .nt { color: #000080 } /* Name.Tag */
-        .highlight .nv { color: #008080 } /* Name.Variable */
-        .highlight .ow { color: #000000; font-weight: bold } /* Operator.Word */
-        .highlight .w { color: #bbbbbb } /* Text.Whitespace */
-        .highlight .mf { color: #009999 } /* Literal.Number.Float */
-        .highlight .mh { color: #009999 } /* Literal.Number.Hex */
-        .highlight .mi { color: #009999 } /* Literal.Number.Integer */
-        .highlight .mo { color: #009999 } /* Literal.Number.Oct */
-        .highlight .sb { color: #d01040 } /* Literal.String.Backtick */
-        .highlight .sc { color: #d01040 } /* Literal.String.Char */
-        .highlight .sd { color: #d01040 } /* Literal.String.Doc */
-        .highlight .s2 { color: #d01040 } /* Literal.String.Double */
-        .highlight .se { color: #d01040 } /* Literal.String.Escape */
-        .highlight .sh { color: #d01040 } /* Literal.String.Heredoc */
-        .highlight .si { color: #d01040 } /* Literal.String.Interpol */
-        .highlight .sx { color: #d01040 } /* Literal.String.Other */
-        .highlight .sr { color: #009926 } /* Literal.String.Regex */
-        .highlight .s1 { color: #d01040 } /* Literal.String.Single */
-        .highlight .ss { color: #990073 } /* Literal.String.Symbol */
-        .highlight .bp { color: #999999 } /* Name.Builtin.Pseudo */
-        .highlight .vc { color: #008080 } /* Name.Variable.Class */
-        .highlight .vg { color: #008080 } /* Name.Variable.Global */
-        .highlight .vi { color: #008080 } /* Name.Variable.Instance */
-        .highlight .il { color: #009999 } /* Literal.Number.Integer.Long */
-        """
+        playwright = sync_playwright().start()
+        browser = playwright.chromium.launch()
+        _chromium = (playwright, browser, browser.new_page())
+    playwright, browser, page = _chromium
+    
+    try:
+        # Reuse the one tab; only open a new one if it was closed or crashed
+        if page.is_closed():
+            page = browser.new_page()
+            _chromium = (playwright, browser, page)
+        
+        page.set_content(complete_html)
+        page.pdf(path=output_path, format='A4', print_background=True,
+                 margin={'top': '2cm', 'right': '2cm', 'bottom': '2cm', 'left': '2cm'})
+    except Exception:
+        # The browser may have crashed or disconnected; start a fresh one next time
+        _close_chromium()
+        raise
+
+def _close_chromium():
+    """Close the shared browser and stop Playwright (runs on the Chromium worker thread)."""
+    global _chromium
+    if _chromium is None:
+        return
+    playwright, browser, _ = _chromium
+    _chromium = None
+    for close in (browser.close, playwright.stop):
+        try:
+            close()
+        except Exception as e:
+            logger.warning(f"Error shutting down Chromium: {e}")
+
+def _shutdown_chromium():
+    """Close the browser at exit, on the worker thread that owns it."""
+    try:
+        _chromium_executor.submit(_close_chromium).result(timeout=30)
+    except Exception as e:
+        logger.warning(f"Error shutting down Chromium: {e}")
+    _chromium_executor.shutdown()
+
+def _html_to_pdf_chromium(html, output_path):
+    """
+    Convert rendered markdown to PDF with headless Chromium via Playwright.
+    """
+    global _chromium_executor
+    try:
+        with _chromium_lock:
+            if _chromium_executor is None:
+                _chromium_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='chromium')
+                # Playwright objects only work on their own thread, so the shutdown has to
+                # run while the executor still accepts work: threading's exit hooks run
+                # (last registered first) before the executors stop, atexit's only after
+                threading._register_atexit(_shutdown_chromium)
         
         # Create a complete HTML document
         complete_html = f"""
@@ -308,7 +953,7 @@ def _markdown_to_pdf_weasyprint(markdown_content, output_path):
             <meta charset="UTF-8">
             <title>Tutorial</title>
             <style>
-                {css_content}
+                {_WEASY_CSS}
             </style>
         </head>
         <body>
@@ -317,54 +962,51 @@ def _markdown_to_pdf_weasyprint(markdown_content, output_path):
         </html>
         """
         
-        # Convert HTML to PDF
-        HTML(string=complete_html).write_pdf(output_path)
+        _chromium_executor.submit(_chromium_print, complete_html, output_path).result()
         
         return output_path
     
     except Exception as e:
-        logger.error(f"Error in _markdown_to_pdf_weasyprint: {str(e)}")
-        # Try another alternative method with pdfkit
-        return _markdown_to_pdf_pdfkit(markdown_content, output_path)
+        logger.error(f"Error in _html_to_pdf_chromium: {str(e)}")
+        return None
 
-def _markdown_to_pdf_pdfkit(markdown_content, output_path):
+def _html_to_pdf_weasyprint(html, output_path):
     """
-    Another alternative method to convert markdown to PDF using pdfkit (wkhtmltopdf).
+    Alternative method to convert rendered markdown to PDF using WeasyPrint.
     """
     try:
-        import markdown
-        import pdfkit
-        
-        # Convert markdown to HTML
-        html = markdown.markdown(
-            markdown_content,
-            extensions=['extra', 'toc', 'tables', 'fenced_code', 'codehilite']
-        )
+        weasyprint = _require('weasyprint')
         
-        # Add CSS for styling
-        css_content = """
-        body {
-            font-family: Arial, sans-serif;
-            line-height: 1.6;
-            margin: 2cm;
-        }
-        h1, h2, h3, h4, h5, h6 {
-            color: #333;
-        }
-        code {
-            font-family: monospace;
-            background-color: #f6f8fa;
-            padding: 0.2em 0.4em;
-            border-radius: 3px;
-        }
-        pre {
-            background-color: #f6f8fa;
-            border-radius: 3px;
-            padding: 16px;
-            overflow: auto;
-        }
+        # Create a complete HTML document
+        complete_html = f"""
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <meta charset="UTF-8">
+            <title>Tutorial</title>
+        </head>
+        <body>
+            {html}
+        </body>
+        </html>
         """
         
+        # Convert HTML to PDF with the pre-parsed stylesheet
+        weasyprint.HTML(string=complete_html).write_pdf(output_path, stylesheets=[_get_weasy_css()])
+        
+        return output_path
+    
+    except Exception as e:
+        logger.error(f"Error in _html_to_pdf_weasyprint: {str(e)}")
+        return None
+
+def _html_to_pdf_pdfkit(html, output_path):
+    """
+    Another alternative method to convert rendered markdown to PDF using pdfkit (wkhtmltopdf).
+    """
+    try:
+        pdfkit = _require('pdfkit')
+        
         # Create a complete HTML document
         complete_html = f"""
         <!DOCTYPE html>
@@ -373,7 +1015,7 @@ def _markdown_to_pdf_pdfkit(markdown_content, output_path):
             <meta charset="UTF-8">
             <title>Tutorial</title>
             <style>
-                {css_content}
+                {_PDFKIT_CSS}
             </style>
         </head>
         <body>
@@ -383,22 +1025,28 @@ def _markdown_to_pdf_pdfkit(markdown_content, output_path):
         """
         
         # Convert HTML to PDF
-        options = {
-            'page-size': 'A4',
-            'margin-top': '2cm',
-            'margin-right': '2cm',
-            'margin-bottom': '2cm',
-            'margin-left': '2cm',
-            'encoding': 'UTF-8',
-            'no-outline': None,
-            'enable-local-file-access': None
-        }
-        
-        pdfkit.from_string(complete_html, output_path, options=options)
+        pdfkit.from_string(complete_html, output_path, options=_PDFKIT_OPTIONS)
         
         return output_path
     
     except Exception as e:
-        logger.error(f"Error in _markdown_to_pdf_pdfkit: {str(e)}")
-        # If all methods fail, return None
-        return None
\ No newline at end of file
+        logger.error(f"Error in _html_to_pdf_pdfkit: {str(e)}")
+        return None
+
+def _via_html(html_to_pdf):
+    """Adapt an HTML-based backend to take markdown; _render_html's cache shares the render between them."""
+    def convert(markdown_content, output_path, css_path):
+        html = _render_html(markdown_content)
+        return html_to_pdf(html, output_path) if html is not None else None
+    return convert
+
+# Backend implementations by name, all called as (markdown_content, output_path, css_path)
+_BACKEND_IMPLS = {
+    'pandoc': _markdown_to_pdf_pandoc,
+    'chromium': _via_html(_html_to_pdf_chromium),
+    'weasyprint': _via_html(_html_to_pdf_weasyprint),
+    'pdfkit': _via_html(_html_to_pdf_pdfkit),
+}
+
+# The probed backends resolved to their functions once; conversions just walk this list
+_BACKEND_FUNCS = [_BACKEND_IMPLS[name] for name in _BACKENDS]
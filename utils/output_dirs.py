@@ -0,0 +1,28 @@
+import os
+
+def find_project_dir(base, name=None, fallback=True):
+    """
+    Locate a project's output directory in one pass over base.
+    
+    Args:
+        base (str): The output base directory
+        name (str, optional): The project directory to look for
+        fallback (bool): Return the first project directory when name isn't there
+        
+    Returns:
+        tuple: (path, names) where path is base/name if it exists, otherwise the
+        first project directory found (None if there are none, or if fallback is
+        off), and names lists every project directory under base ([] if base
+        doesn't exist)
+    """
+    try:
+        with os.scandir(base) as it:
+            names = [entry.name for entry in it if entry.is_dir()]
+    except OSError:
+        return None, []
+    
+    if name and name in names:
+        return os.path.join(base, name), names
+    if fallback and names:
+        return os.path.join(base, names[0]), names
+    return None, names